@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+ANALYTICS_DIR = "analytics"
+ANALYTICS_DB = os.path.join(ANALYTICS_DIR, "analytics.db")
+LEGACY_ANALYTICS_FILE = os.path.join(ANALYTICS_DIR, "daily_analytics.json")
+
+TREND_BUCKETS = {
+    "day": "date",
+    "week": "date(date, '-6 days', 'weekday 1')",
+    "month": "strftime('%Y-%m-01', date)",
+    "year": "strftime('%Y-01-01', date)",
+}
+
+FIELDS = ("date", "total_income", "expenditure", "net_income", "total_items_sold", "products_sold")
+
+
+class AnalyticsStore:
+    """Append-only history of report summaries in an embedded SQLite file.
+
+    Every report appends one row in its own transaction, so a crash can
+    never truncate the history and nothing is ever pruned. When a day has
+    several reports the latest one is that day's figure, as it was in the
+    old JSON file. Queries use the (date, id) index.
+    """
+
+    def __init__(self, path=ANALYTICS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = FULL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS daily_analytics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recorded_at TEXT NOT NULL,
+                date TEXT NOT NULL,
+                total_income REAL NOT NULL,
+                expenditure REAL NOT NULL,
+                net_income REAL NOT NULL,
+                total_items_sold INTEGER NOT NULL,
+                products_sold INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_daily_analytics_date ON daily_analytics (date, id);
+        """)
+        self._import_legacy_file()
+
+    def _import_legacy_file(self, path=LEGACY_ANALYTICS_FILE):
+        """One-off import of the old daily_analytics.json"""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r') as f:
+                entries = json.load(f)
+        except ValueError as e:
+            print(f"⚠️ Could not import {path}: {e}")
+            return
+        self.append_many(entries)
+        os.replace(path, path + ".imported")
+        print(f"✅ Imported {len(entries)} analytics entries from {path}")
+
+    def append(self, entry):
+        """Record one summary (a dict with the FIELDS keys)"""
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        recorded_at = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(f"""
+                    INSERT INTO daily_analytics (recorded_at, {", ".join(FIELDS)})
+                    VALUES (?, {", ".join("?" * len(FIELDS))})
+                """, [(recorded_at, *(entry[field] for field in FIELDS)) for entry in entries])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _latest_per_day(self, start=None, end=None):
+        """Query for each day's latest row and its parameters; only the given
+        bounds go in the WHERE clause so SQLite can range-scan the index"""
+        bounds = []
+        params = {}
+        if start is not None:
+            bounds.append("date >= :start")
+            params["start"] = start
+        if end is not None:
+            bounds.append("date <= :end")
+            params["end"] = end
+        where = f"WHERE {' AND '.join(bounds)}" if bounds else ""
+        return f"""
+            SELECT a.* FROM daily_analytics AS a
+            JOIN (
+                SELECT date, MAX(id) AS id FROM daily_analytics
+                {where}
+                GROUP BY date
+            ) AS latest ON latest.id = a.id
+        """, params
+
+    def daily(self, start=None, end=None):
+        """Each day's latest summary between ``start`` and ``end`` (ISO dates, inclusive)"""
+        query, params = self._latest_per_day(start, end)
+        with self._lock:
+            rows = self.conn.execute(query + " ORDER BY a.date", params).fetchall()
+        return [dict(zip(FIELDS, row[2:])) for row in rows]
+
+    def trend(self, period="month", start=None, end=None):
+        """Per-week/month/year totals of the daily figures"""
+        if period not in TREND_BUCKETS:
+            raise ValueError(f"Unknown period: {period}")
+        query, params = self._latest_per_day(start, end)
+        with self._lock:
+            rows = self.conn.execute(f"""
+                SELECT {TREND_BUCKETS[period]} AS period, SUM(total_income), SUM(expenditure),
+                       SUM(net_income), SUM(total_items_sold), COUNT(*)
+                FROM ({query})
+                GROUP BY period
+                ORDER BY period
+            """, params).fetchall()
+        return [{
+            "period": row[0],
+            "total_income": row[1],
+            "expenditure": row[2],
+            "net_income": row[3],
+            "total_items_sold": row[4],
+            "days": row[5]
+        } for row in rows]
+
+    def close(self):
+        self.conn.close()
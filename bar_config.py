@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+
+CONFIG_FILE = os.getenv('BAR_CONFIG_FILE', 'bar_config.json')
+
+DEFAULT_CONFIG = {"bar_name": "LIQUOR WORLD", "tax_rate": 0.16, "currency": "Ksh"}
+
+# Minimum seconds between stat() calls on the config file
+CHECK_INTERVAL = 1.0
+
+
+class BarConfig:
+    """Parsed ``bar_config.json``, shared by the UI and the report generator.
+
+    The file is parsed once and re-read only when its mtime or size
+    changes, so edits take effect without a restart while most accesses
+    are a dictionary lookup. Missing keys fall back to DEFAULT_CONFIG, and
+    a file that fails to parse keeps the last good values.
+    """
+
+    def __init__(self, path=CONFIG_FILE, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._values = dict(DEFAULT_CONFIG)
+        self._signature = None
+        self._checked_at = None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return
+
+        if signature is None:
+            self._values = dict(DEFAULT_CONFIG)
+        else:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    values = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read {self.path}, keeping previous settings: {e}")
+                self._signature = signature
+                return
+            self._values = {**DEFAULT_CONFIG, **values}
+        self._signature = signature
+
+    def reload(self):
+        """Re-read the file now instead of at the next check"""
+        with self._lock:
+            self._checked_at = None
+            self._signature = None
+            self._refresh()
+
+    def as_dict(self):
+        with self._lock:
+            self._refresh()
+            return dict(self._values)
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._refresh()
+            return self._values.get(key, default)
+
+    @property
+    def tax_rate(self):
+        try:
+            return float(self.get('tax_rate'))
+        except (TypeError, ValueError):
+            return DEFAULT_CONFIG['tax_rate']
+
+    @property
+    def currency(self):
+        return str(self.get('currency'))
+
+    @property
+    def bar_name(self):
+        return str(self.get('bar_name'))
+
+
+def calculate_financials(total_income, expenditure, tax_rate):
+    """Tax (VAT) and net income; returns ``(tax_amount, net_income)``"""
+    tax_amount = total_income * tax_rate
+    return tax_amount, total_income - expenditure - tax_amount
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config():
+    """The process-wide BarConfig"""
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = BarConfig()
+        return _config
@@ -0,0 +1,61 @@
+class Basket:
+    """Quantities entered for the current sale, with running totals.
+
+    Lines are keyed by product name and kept regardless of which products
+    are currently shown, so the basket survives filtering and searching.
+    Each change applies only its delta to the totals; revenue is kept in
+    whole cents so repeated +/- presses never drift.
+    """
+
+    def __init__(self):
+        self._lines = {}
+        self._revenue_cents = 0
+        self.total_items = 0
+
+    @staticmethod
+    def _cents(price):
+        return int(round(price * 100))
+
+    @property
+    def total_revenue(self):
+        return self._revenue_cents / 100
+
+    def quantity(self, name):
+        line = self._lines.get(name)
+        return line["quantity"] if line else 0
+
+    def set_quantity(self, product, quantity):
+        """Set the quantity for ``product`` (a catalog product dict); zero
+        or less removes the line"""
+        quantity = max(int(quantity), 0)
+        name = product["name"]
+        line = self._lines.get(name)
+        previous = line["quantity"] if line else 0
+        if line is not None:
+            self._revenue_cents -= previous * line["price_cents"]
+
+        if quantity > 0:
+            line = {"product": product, "quantity": quantity, "price_cents": self._cents(product["price"])}
+            self._lines[name] = line
+            self._revenue_cents += quantity * line["price_cents"]
+        else:
+            self._lines.pop(name, None)
+        self.total_items += quantity - previous
+
+    def update_product(self, product):
+        """Pick up a refreshed price or stock level for a product in the basket"""
+        line = self._lines.get(product["name"])
+        if line is not None and line["product"] is not product:
+            self.set_quantity(product, line["quantity"])
+
+    def lines(self):
+        """``(product, quantity)`` pairs in the order they were added"""
+        return [(line["product"], line["quantity"]) for line in self._lines.values()]
+
+    def clear(self):
+        self._lines = {}
+        self._revenue_cents = 0
+        self.total_items = 0
+
+    def __len__(self):
+        return len(self._lines)
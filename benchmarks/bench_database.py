@@ -0,0 +1,127 @@
+"""DatabaseManager hot paths against seeded local databases.
+
+SQLite always runs (in the benchmark's temporary directory). PostgreSQL
+runs with ``--postgres``, inside throwaway ``bench_*`` schemas of the
+database configured by the usual DB_* variables, dropped afterwards.
+"""
+import atexit
+import itertools
+import os
+import random
+import sqlite3
+
+from harness import benchmark
+from synthetic import make_products
+
+SIZES = (100, 1000, 10000, 100000)
+
+_databases = {}
+
+
+def _seed_rows(products):
+    return [
+        (p["name"], p["category"], p["subcategory"], 1_000_000, p["price"], p["icon"])
+        for p in products
+    ]
+
+
+def _open_sqlite(size):
+    from sqlite_backend import SQLiteDatabaseManager
+
+    path = os.path.abspath(f"bench_{size}.db")
+    db = SQLiteDatabaseManager(path)
+    products = make_products(size)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany("""
+            INSERT INTO products (name, category, subcategory, current_stock, price, icon)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, _seed_rows(products))
+        conn.execute("ANALYZE")
+    conn.close()
+    atexit.register(db.close)
+    return db, products
+
+
+def _open_postgres(size):
+    from psycopg2.extras import execute_values
+    from db_pool import create_pool
+    from postgres_backend import DatabaseManager
+
+    schema = f"bench_{os.getpid()}_{size}"
+    admin = create_pool(minconn=1, maxconn=1)
+    with admin.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA {schema}")
+
+    # Every connection the manager opens works inside the bench schema
+    os.environ["PGOPTIONS"] = f"-c search_path={schema}"
+    try:
+        db = DatabaseManager(minconn=1, maxconn=2)
+    finally:
+        del os.environ["PGOPTIONS"]
+    products = make_products(size)
+    with db.pool.cursor() as cursor:
+        execute_values(cursor, """
+            INSERT INTO products (name, category, subcategory, current_stock, price, icon)
+            VALUES %s
+        """, _seed_rows(products), page_size=1000)
+        cursor.execute("ANALYZE products")
+
+    def drop():
+        db.close()
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.closeall()
+    atexit.register(drop)
+    return db, products
+
+
+BACKENDS = {"sqlite": _open_sqlite}
+if os.getenv("BENCH_POSTGRES"):
+    BACKENDS["postgres"] = _open_postgres
+
+
+def database(backend, size):
+    """Seeded database for ``backend`` with ``size`` products (cached)"""
+    key = (backend, size)
+    if key not in _databases:
+        _databases[key] = BACKENDS[backend](size)
+    return _databases[key]
+
+
+def register(backend):
+    @benchmark(f"db.{backend}.get_products", SIZES, repeat=5)
+    def get_products(size):
+        db, _ = database(backend, size)
+        return lambda: db.get_products()
+
+    @benchmark(f"db.{backend}.get_products_filtered", SIZES, repeat=10)
+    def get_products_filtered(size):
+        db, _ = database(backend, size)
+        return lambda: db.get_products("WHISKEY", "SCOTCH")
+
+    @benchmark(f"db.{backend}.update_stock", SIZES, repeat=20)
+    def update_stock(size):
+        db, products = database(backend, size)
+        names = itertools.cycle(random.Random(1).sample([p["name"] for p in products], min(size, 100)))
+        return lambda: db.update_stock(next(names), 1)
+
+    @benchmark(f"db.{backend}.record_sales_batch", SIZES, repeat=20)
+    def record_sales_batch(size):
+        db, products = database(backend, size)
+        rng = random.Random(2)
+        return lambda: db.record_sales_batch([
+            {"name": p["name"], "quantity": 1} for p in rng.sample(products, 10)
+        ])
+
+    @benchmark(f"db.{backend}.add_new_product", SIZES, repeat=20)
+    def add_new_product(size):
+        db, _ = database(backend, size)
+        counter = itertools.count()
+        return lambda: db.add_new_product({
+            "name": f"BENCH NEW {next(counter)}", "category": "BENCH", "stock": 10, "price": 100.0
+        })
+
+
+for name in BACKENDS:
+    register(name)
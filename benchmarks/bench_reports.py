@@ -0,0 +1,14 @@
+"""Excel report generation on synthetic catalogs"""
+from harness import benchmark
+from synthetic import make_products, make_sales
+
+SIZES = (100, 1000, 10000, 100000)
+
+
+@benchmark("report.generate_report", SIZES, repeat=3, memory=True)
+def generate_report(size):
+    from report_generator import generate_report
+
+    products = make_products(size)
+    sales = make_sales(products, max(10, size // 10))
+    return lambda: generate_report(sales, 500.0, products)
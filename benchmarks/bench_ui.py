@@ -0,0 +1,74 @@
+"""Headless SalesForm list and basket updates"""
+import os
+
+from harness import benchmark
+from synthetic import make_products
+
+SIZES = (100, 1000, 10000, 100000)
+
+_form = None
+
+
+class _ProductList:
+    """Stands in for the RecycleView: SalesForm only touches its data"""
+
+    def __init__(self):
+        self.data = []
+
+    def refresh_from_data(self):
+        pass
+
+
+def form():
+    """One SalesForm with no kv rules loaded and no database"""
+    global _form
+    if _form is None:
+        from kivy.base import EventLoop
+        EventLoop.ensure_window = lambda: None
+        import main
+
+        # Its background connect goes to a scratch SQLite file; results are
+        # never delivered because the Kivy clock is not running
+        os.environ["DB_BACKEND"] = "sqlite"
+        os.environ["SQLITE_PATH"] = os.path.abspath("ui.db")
+        _form = main.SalesForm()
+        _form.worker.shutdown(wait=True)
+        _form.ids = {"products_list": _ProductList()}
+    return _form
+
+
+@benchmark("ui.populate_products", SIZES, repeat=10)
+def populate_products(size):
+    sales_form = form()
+    products = make_products(size)
+
+    def run():
+        sales_form.products_data = products
+        sales_form.populate_products()
+    return run
+
+
+@benchmark("ui.update_quantity", SIZES, repeat=20)
+def update_quantity(size):
+    sales_form = form()
+    sales_form.products_data = make_products(size)
+    sales_form.basket.clear()
+    sales_form.populate_products()
+    middle = size // 2
+
+    def run():
+        # One +/- press on a row
+        for quantity in (1, 2, 1, 0):
+            sales_form.update_quantity(middle, quantity)
+    return run
+
+
+@benchmark("ui.calculate_preview", SIZES, repeat=20)
+def calculate_preview(size):
+    sales_form = form()
+    sales_form.products_data = make_products(size)
+    sales_form.basket.clear()
+    sales_form.populate_products()
+    for index in range(0, size, max(1, size // 50)):
+        sales_form.update_quantity(index, 1)
+    return sales_form.calculate_preview
@@ -0,0 +1,102 @@
+"""Timing, registry and baseline comparison for the benchmark suite"""
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+# (name, sizes, factory, options) for every registered benchmark
+BENCHMARKS = []
+
+
+def benchmark(name, sizes=(None,), repeat=5, memory=False):
+    """Register a benchmark.
+
+    The decorated factory is called once per size (outside the timing) and
+    returns the zero-argument callable to time, or ``None`` to skip that
+    size. ``repeat`` is scaled down for large sizes so a full run stays
+    reasonable; ``memory`` also records the peak Python allocation of one
+    extra call.
+    """
+    def register(factory):
+        BENCHMARKS.append((name, tuple(sizes), factory, {"repeat": repeat, "memory": memory}))
+        return factory
+    return register
+
+
+def repeats_for(size, repeat):
+    if size is None or size <= 1000:
+        return repeat
+    return max(1, repeat * 1000 // size)
+
+
+def measure(func, repeat, memory=False):
+    """Run ``func`` once to warm up, then ``repeat`` timed times"""
+    func()
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    result = {
+        "repeat": repeat,
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "max_ms": max(timings)
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            result["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def result_key(name, size):
+    return name if size is None else f"{name}[{size}]"
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine()
+    }
+
+
+def save_results(path, results):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, threshold):
+    """Benchmarks whose median got slower than the baseline by more than
+    ``threshold`` (0.2 = 20%); returns ``(key, baseline_ms, current_ms)``"""
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous and current["median_ms"] > previous["median_ms"] * (1 + threshold):
+            regressions.append((key, previous["median_ms"], current["median_ms"]))
+    return regressions
@@ -0,0 +1,104 @@
+"""Run the benchmark suite and compare it against a stored baseline.
+
+    python benchmarks/run.py                      # everything, SQLite only
+    python benchmarks/run.py --quick -k report    # sizes up to 1k, reports only
+    python benchmarks/run.py --postgres --save-baseline
+    python benchmarks/run.py --baseline benchmarks/baseline.json --threshold 0.25
+
+Results are written as JSON (``--output``). With a baseline, any benchmark
+whose median is slower by more than ``--threshold`` is listed and the
+exit status is 1, so the suite can gate a deployment. Baselines are only
+meaningful on the machine that recorded them.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bar sales benchmark suite")
+    parser.add_argument("-k", "--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="Only sizes up to 1000")
+    parser.add_argument("--max-size", type=int, help="Skip sizes above this")
+    parser.add_argument("--postgres", action="store_true", help="Also benchmark PostgreSQL (DB_* settings)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+    max_size = 1000 if args.quick else args.max_size
+
+    # Headless Kivy, and everything the app writes (reports, analytics,
+    # journal, scratch databases) goes to a throwaway directory
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+    os.environ.setdefault("KIVY_WINDOW", "")
+    if args.postgres:
+        os.environ["BENCH_POSTGRES"] = "1"
+    sys.path[:0] = [BENCH_DIR, REPO_DIR]
+    workdir = tempfile.mkdtemp(prefix="bar_bench_")
+    os.chdir(workdir)
+
+    import harness
+    import bench_database  # noqa: F401 (registers benchmarks)
+    import bench_reports  # noqa: F401
+    import bench_ui  # noqa: F401
+
+    results = {}
+    try:
+        for name, sizes, factory, options in harness.BENCHMARKS:
+            if args.filter not in name:
+                continue
+            for size in sizes:
+                if max_size is not None and size is not None and size > max_size:
+                    continue
+                key = harness.result_key(name, size)
+                func = factory(size)
+                if func is None:
+                    continue
+                result = harness.measure(
+                    func, harness.repeats_for(size, options["repeat"]), options["memory"]
+                )
+                results[key] = result
+                memory = f"  peak {result['peak_kb']:,.0f} KiB" if "peak_kb" in result else ""
+                print(f"{key:<48} median {result['median_ms']:10.2f} ms  (n={result['repeat']}){memory}")
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    harness.save_results(output, results)
+    print(f"\n📊 Results written to {output}")
+
+    if args.save_baseline:
+        harness.save_results(baseline_path, results)
+        print(f"📌 Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("No baseline to compare against (use --save-baseline)")
+        return 0
+
+    regressions = harness.compare(results, harness.load_results(baseline_path), args.threshold)
+    if not regressions:
+        print(f"✅ No regressions over {args.threshold:.0%} against the baseline")
+        return 0
+    print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+    for key, before, after in regressions:
+        print(f"  {key}: {before:.2f} ms -> {after:.2f} ms ({after / before - 1:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Many tills selling the same few products at once.
+
+Each till is a thread with its own DatabaseManager (one connection), so
+baskets race for the same rows the way separate tills do at peak hour.
+Baskets list their products in random order to provoke lock-order
+deadlocks. The run reports checkout throughput and then checks that no
+stock went negative and that the sales table accounts for every unit
+that left the shelf; the exit status is 1 if either check fails.
+
+    python benchmarks/stress_sellers.py --tills 16 --seconds 10
+    python benchmarks/stress_sellers.py --backend sqlite --tills 4
+    python benchmarks/stress_sellers.py --stock 50    # mostly stock-outs
+
+tests/test_concurrent_checkout.py runs the same sellers against a small
+stock as part of the test suite.
+
+PostgreSQL runs inside a throwaway ``stress_*`` schema of the database
+configured by the usual DB_* variables.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent checkout stress test")
+    parser.add_argument("--backend", choices=("postgres", "sqlite"), default="postgres")
+    parser.add_argument("--tills", type=int, default=16, help="Concurrent sellers")
+    parser.add_argument("--seconds", type=float, default=10, help="Stop selling after this long")
+    parser.add_argument("--products", type=int, default=5, help="Size of the contested product set")
+    parser.add_argument("--stock", type=int, default=1_000_000,
+                        help="Starting stock of each product (the default outlasts any run; "
+                             "use a small one to exercise stock-outs)")
+    parser.add_argument("--basket-size", type=int, default=3, help="Products per basket")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sold = 0
+        self.rejected = 0
+        self.errors = 0
+        self.units = {}
+        self.latencies = []
+
+    def record_error(self, elapsed):
+        with self.lock:
+            self.latencies.append(elapsed)
+            self.errors += 1
+
+    def record(self, result, elapsed):
+        with self.lock:
+            self.latencies.append(elapsed)
+            if result["success"]:
+                self.sold += 1
+                for line in result["items"]:
+                    self.units[line["name"]] = self.units.get(line["name"], 0) + line["quantity"]
+            elif any(f["name"] is None for f in result["failures"]):
+                self.errors += 1
+            else:
+                self.rejected += 1
+
+
+def seed_rows(names, stock):
+    return [(name, "STRESS", "HOT", stock, 100.0, "🍺") for name in names]
+
+
+def open_postgres(args, names):
+    from psycopg2.extras import execute_values
+    from db_pool import create_pool
+
+    schema = f"stress_{os.getpid()}"
+    admin = create_pool(minconn=1, maxconn=1)
+    with admin.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA {schema}")
+    # Every connection opened from here on works inside the stress schema
+    os.environ["PGOPTIONS"] = f"-c search_path={schema}"
+
+    from postgres_backend import DatabaseManager
+    setup = DatabaseManager(minconn=1, maxconn=1)
+    with setup.pool.cursor() as cursor:
+        execute_values(cursor, """
+            INSERT INTO products (name, category, subcategory, current_stock, price, icon)
+            VALUES %s
+        """, seed_rows(names, args.stock))
+
+    def till():
+        return DatabaseManager(minconn=1, maxconn=1)
+
+    def cleanup():
+        setup.close()
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.closeall()
+    return setup, till, cleanup
+
+
+def open_sqlite(args, names):
+    from sqlite_backend import SQLiteDatabaseManager
+
+    workdir = tempfile.mkdtemp(prefix="bar_stress_")
+    path = os.path.join(workdir, "stress.db")
+    setup = SQLiteDatabaseManager(path)
+    conn = setup._connection()
+    conn.executemany("""
+        INSERT INTO products (name, category, subcategory, current_stock, price, icon)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, seed_rows(names, args.stock))
+
+    def till():
+        return SQLiteDatabaseManager(path)
+
+    def cleanup():
+        setup.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return setup, till, cleanup
+
+
+def stock_levels(db, names):
+    return {p["name"]: p["stock"] for p in db.get_products("STRESS") if p["name"] in names}
+
+
+def units_recorded(db, names):
+    """Units per product according to the sales table"""
+    query = """
+        SELECT p.name, SUM(s.quantity_sold) FROM sales AS s
+        JOIN products AS p ON p.id = s.product_id
+        WHERE p.category = 'STRESS' GROUP BY p.name
+    """
+    if hasattr(db, "pool"):
+        with db.pool.cursor() as cursor:
+            cursor.execute(query)
+            return {name: int(total) for name, total in cursor.fetchall()}
+    return {name: int(total) for name, total in db._connection().execute(query).fetchall()}
+
+
+def sell(db, names, args, stats, deadline, seed):
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        basket = rng.sample(names, min(args.basket_size, len(names)))
+        items = [{"name": name, "quantity": rng.randint(1, 3)} for name in basket]
+        start = time.perf_counter()
+        try:
+            result = db.record_sales_batch(items)
+        except Exception as e:
+            # e.g. a locked SQLite database; count it rather than lose the till
+            print(f"⚠️ Checkout raised: {e}")
+            stats.record_error(time.perf_counter() - start)
+            continue
+        stats.record(result, time.perf_counter() - start)
+    db.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+    sys.path[:0] = [REPO_DIR]
+
+    names = [f"STRESS BEER {i}" for i in range(args.products)]
+    opener = open_postgres if args.backend == "postgres" else open_sqlite
+    setup, till, cleanup = opener(args, names)
+    try:
+        tills = [till() for _ in range(args.tills)]
+        stats = Stats()
+        deadline = time.monotonic() + args.seconds
+        threads = [
+            threading.Thread(target=sell, args=(db, names, args, stats, deadline, args.seed + i))
+            for i, db in enumerate(tills)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stock = stock_levels(setup, names)
+        recorded = units_recorded(setup, names)
+    finally:
+        cleanup()
+
+    latencies = sorted(stats.latencies)
+    attempts = len(latencies)
+    print(f"🍺 {args.tills} tills, {args.products} products, {elapsed:.1f}s on {args.backend}")
+    print(f"   {stats.sold} baskets sold ({stats.sold / elapsed:.0f}/s), "
+          f"{stats.rejected} rejected for stock, {stats.errors} failed")
+    if attempts:
+        print(f"   checkout latency p50 {latencies[attempts // 2] * 1000:.1f} ms, "
+              f"p99 {latencies[min(attempts - 1, attempts * 99 // 100)] * 1000:.1f} ms")
+
+    problems = []
+    for name in names:
+        if stock[name] < 0:
+            problems.append(f"{name}: stock went negative ({stock[name]})")
+        if args.stock - stock[name] != recorded.get(name, 0):
+            problems.append(
+                f"{name}: {args.stock - stock[name]} units left the shelf but {recorded.get(name, 0)} were recorded"
+            )
+        if stats.units.get(name, 0) != recorded.get(name, 0):
+            problems.append(
+                f"{name}: tills were told {stats.units.get(name, 0)} units sold, {recorded.get(name, 0)} recorded"
+            )
+
+    if problems:
+        print("❌ Stock invariants violated:")
+        for problem in problems:
+            print(f"   {problem}")
+        return 1
+    print("✅ No oversell; stock and sales agree")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""Deterministic synthetic catalogs and sales for the benchmarks"""
+import random
+
+CATEGORIES = {
+    "BEERS": ["BOTTLES", "CANS"],
+    "WINES": [None],
+    "WHISKEY": ["SCOTCH", "BOURBON", "IRISH"],
+    "SPIRIT": [None],
+    "LIQUER": [None],
+    "SOFT DRINKS": [None],
+    "SNACKS": [None],
+}
+ICONS = ["🍺", "🍷", "🥃", "🍸", "🥤", "🍿"]
+SIZES = ["250ML", "330ML", "500ML", "750ML", "1LTR"]
+
+
+def make_products(count, seed=42):
+    """``count`` unique products shaped like ProductCatalog entries"""
+    rng = random.Random(seed)
+    categories = list(CATEGORIES)
+    products = []
+    for i in range(1, count + 1):
+        category = rng.choice(categories)
+        products.append({
+            "id": i,
+            "name": f"{category[:4]} BRAND{rng.randrange(1000):03d} {rng.choice(SIZES)} #{i}",
+            "category": category,
+            "subcategory": rng.choice(CATEGORIES[category]),
+            "stock": rng.randrange(10, 500),
+            "price": float(rng.randrange(5, 600) * 10),
+            "icon": rng.choice(ICONS)
+        })
+    return products
+
+
+def make_sales(products, count, seed=7):
+    """Report rows for ``count`` distinct products, as SalesForm builds them"""
+    rng = random.Random(seed)
+    sales = []
+    for product in rng.sample(products, min(count, len(products))):
+        quantity = rng.randrange(1, min(product["stock"], 12))
+        sales.append({
+            "Product ID": product["id"],
+            "Product Name": product["name"],
+            "Category": product["category"],
+            "Subcategory": product["subcategory"] or "",
+            "Stock Before": product["stock"],
+            "Quantity Sold": quantity,
+            "Price Per Unit": product["price"],
+            "Total Sale": quantity * product["price"],
+            "Stock After": product["stock"] - quantity
+        })
+    return sales
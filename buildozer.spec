@@ -37,7 +37,7 @@ version = 0.1
 
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
-requirements = python3,kivy,pandas,openpyxl
+requirements = python3,kivy,pandas,openpyxl,sqlite3
 
 
 # (str) Custom source folders for requirements
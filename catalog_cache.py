@@ -0,0 +1,120 @@
+import threading
+from datetime import timedelta
+
+from search_index import ProductSearchIndex
+
+# Re-read rows a little older than the last sync so that transactions which
+# committed late (their updated_at is the transaction start time) are not missed
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _sort_key(product):
+    # Same order as "ORDER BY category, subcategory, name" (NULLs last)
+    subcategory = product.get("subcategory")
+    return (product["category"], subcategory is None, subcategory or "", product["name"])
+
+
+class ProductCatalog:
+    """Process-local product cache indexed by category and subcategory.
+
+    ``load()`` reads the whole catalog once; ``refresh()`` only fetches rows
+    whose ``updated_at`` moved since the last sync and re-indexes the
+    categories they touch. Lookups and searches never hit the database.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.last_sync = None
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._all = []
+        self._by_category = {}
+        self._by_subcategory = {}
+        self._search = ProductSearchIndex()
+
+    def load(self):
+        """Full load of the catalog"""
+        products = self.db.get_products_since(None)
+        with self._lock:
+            self._by_id = {}
+            self._search = ProductSearchIndex()
+            self.last_sync = None
+            self._merge(products)
+            self._reindex(None)
+        return len(products)
+
+    def refresh(self):
+        """Fetch products changed since the last sync; returns how many changed"""
+        if self.last_sync is None:
+            return self.load()
+
+        products = self.db.get_products_since(self.last_sync - SYNC_OVERLAP)
+        with self._lock:
+            changed = self._merge(products)
+            if changed:
+                self._reindex(changed)
+        return len(changed)
+
+    def _merge(self, products):
+        """Apply fetched rows; returns the categories whose contents changed"""
+        changed = set()
+        for product in products:
+            previous = self._by_id.get(product["id"])
+            if previous == product:
+                continue
+            if previous is not None:
+                changed.add(previous["category"])
+            changed.add(product["category"])
+            self._by_id[product["id"]] = product
+            self._search.add(product)
+            updated_at = product.get("updated_at")
+            if updated_at is not None and (self.last_sync is None or updated_at > self.last_sync):
+                self.last_sync = updated_at
+        return changed
+
+    def _reindex(self, categories):
+        """Rebuild the category buckets (only ``categories`` when given)"""
+        if categories is None:
+            categories = {p["category"] for p in self._by_id.values()}
+            self._by_category = {}
+            self._by_subcategory = {}
+
+        for category in categories:
+            products = sorted(
+                (p for p in self._by_id.values() if p["category"] == category),
+                key=_sort_key
+            )
+            for key in [k for k in self._by_subcategory if k[0] == category]:
+                del self._by_subcategory[key]
+            if not products:
+                self._by_category.pop(category, None)
+                continue
+            self._by_category[category] = products
+            for product in products:
+                key = (category, product.get("subcategory"))
+                self._by_subcategory.setdefault(key, []).append(product)
+
+        self._all = [p for category in sorted(self._by_category) for p in self._by_category[category]]
+
+    def get_products(self, category="All", subcategory="All"):
+        """Same filtering as DatabaseManager.get_products, served from memory"""
+        with self._lock:
+            if category == "All":
+                return list(self._all)
+            if subcategory == "All":
+                return list(self._by_category.get(category, []))
+            return list(self._by_subcategory.get((category, subcategory), []))
+
+    def search(self, text, limit=None):
+        """Ranked, typo-tolerant search over names, categories and subcategories"""
+        with self._lock:
+            return self._search.search(text, limit)
+
+    def get_categories(self):
+        with self._lock:
+            return ["All"] + sorted(self._by_category)
+
+    def get_subcategories(self, category):
+        with self._lock:
+            subcategories = {sub for (cat, sub) in self._by_subcategory if cat == category and sub is not None}
+        return ["All"] + sorted(subcategories)
@@ -0,0 +1,411 @@
+"""Bulk catalog import and export as CSV or XLSX.
+
+Imports are validated row by row first; rows that fail are reported (and
+written to a ``.rejects.csv`` file next to the input) while the rest are
+loaded. On PostgreSQL the good rows are streamed into a temporary staging
+table with ``COPY`` and merged into ``products`` with two set-based
+statements, so a full catalog refresh is a handful of round trips however
+many SKUs it has. Only products that actually change are rewritten (and
+so picked up by the tills' catalog refresh); stock changes are logged to
+``stock_updates``.
+
+Columns: name, category, subcategory, stock, price, icon. Name, category
+and price are required; an empty subcategory, stock or icon leaves an
+existing product's value alone (new products start at 0 stock).
+
+    python catalog_io.py import products.xlsx
+    python catalog_io.py import products.csv --dry-run
+    python catalog_io.py export catalog.csv
+"""
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import time
+from decimal import Decimal, InvalidOperation
+
+from db_backend import open_database
+from migrations import SQLITE_NOW
+from sqlite_backend import SQLiteDatabaseManager
+
+CATALOG_COLUMNS = ("name", "category", "subcategory", "stock", "price", "icon")
+REQUIRED_COLUMNS = ("name", "category", "price")
+
+# Other header spellings accepted on import
+COLUMN_ALIASES = {
+    "product": "name",
+    "product_name": "name",
+    "current_stock": "stock",
+    "quantity": "stock",
+    "unit_price": "price",
+}
+
+# Column widths from the products table
+MAX_LENGTHS = {"name": 255, "category": 100, "subcategory": 100, "icon": 10}
+
+MAX_PRICE = Decimal("99999999.99")
+
+STAGING_TABLE = """
+    CREATE TEMP TABLE catalog_staging (
+        name VARCHAR(255) PRIMARY KEY,
+        category VARCHAR(100) NOT NULL,
+        subcategory VARCHAR(100),
+        stock INTEGER,
+        price DECIMAL(10, 2) NOT NULL,
+        icon VARCHAR(10)
+    ) ON COMMIT DROP
+"""
+
+# Lock the affected products in id order (as checkouts do), rewrite the
+# ones that differ and log their stock changes, in one statement
+POSTGRES_UPDATE = """
+    WITH locked AS (
+        SELECT p.id, p.current_stock AS old_stock
+        FROM products AS p
+        JOIN catalog_staging AS s ON s.name = p.name
+        ORDER BY p.id
+        FOR UPDATE OF p
+    ),
+    updated AS (
+        UPDATE products AS p
+        SET category = s.category,
+            subcategory = COALESCE(s.subcategory, p.subcategory),
+            current_stock = COALESCE(s.stock, p.current_stock),
+            price = s.price,
+            icon = COALESCE(s.icon, p.icon),
+            updated_at = CURRENT_TIMESTAMP
+        FROM catalog_staging AS s, locked AS l
+        WHERE s.name = p.name AND l.id = p.id
+          AND (p.category, p.subcategory, p.current_stock, p.price, p.icon) IS DISTINCT FROM
+              (s.category, COALESCE(s.subcategory, p.subcategory), COALESCE(s.stock, p.current_stock),
+               s.price, COALESCE(s.icon, p.icon))
+        RETURNING p.id, l.old_stock, p.current_stock
+    ),
+    logged AS (
+        INSERT INTO stock_updates (product_id, previous_stock, new_stock, notes)
+        SELECT id, old_stock, current_stock, 'Catalog import'
+        FROM updated
+        WHERE old_stock <> current_stock
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM updated), (SELECT COUNT(*) FROM logged)
+"""
+
+POSTGRES_INSERT = """
+    INSERT INTO products (name, category, subcategory, current_stock, price, icon)
+    SELECT s.name, s.category, s.subcategory, COALESCE(s.stock, 0), s.price, s.icon
+    FROM catalog_staging AS s
+    WHERE NOT EXISTS (SELECT 1 FROM products AS p WHERE p.name = s.name)
+    ON CONFLICT (name) DO NOTHING
+"""
+
+EXPORT_QUERY = """
+    SELECT name, category, subcategory, current_stock AS stock, price, icon
+    FROM products
+    ORDER BY category, subcategory, name
+"""
+
+
+def _normalize_header(value):
+    key = str(value or "").strip().lower().replace(" ", "_")
+    return COLUMN_ALIASES.get(key, key)
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield [_normalize_header(h) for h in header]
+        for row in reader:
+            yield row
+
+
+def _read_xlsx(path):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [_normalize_header(h) for h in header]
+        for row in rows:
+            yield list(row)
+    finally:
+        wb.close()
+
+
+def read_catalog_rows(path):
+    """Yield ``(line_number, {column: value})`` for every data row of a
+    CSV or XLSX file"""
+    reader = _read_xlsx if path.lower().endswith((".xlsx", ".xlsm")) else _read_csv
+    rows = reader(path)
+    header = next(rows, None)
+    if header is None:
+        return
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"{path} has no {', '.join(missing)} column(s)")
+    for line, values in enumerate(rows, 2):
+        if not any(value not in (None, "") for value in values):
+            continue
+        yield line, {
+            column: value for column, value in zip(header, values) if column in CATALOG_COLUMNS
+        }
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def validate_row(row):
+    """``(name, category, subcategory, stock, price, icon)`` ready for
+    loading, or raises ValueError describing every problem with the row"""
+    errors = []
+    values = {column: _text(row.get(column)) for column in CATALOG_COLUMNS}
+
+    for column in REQUIRED_COLUMNS:
+        if values[column] is None:
+            errors.append(f"{column} is required")
+    for column, limit in MAX_LENGTHS.items():
+        if values[column] is not None and len(values[column]) > limit:
+            errors.append(f"{column} is longer than {limit} characters")
+
+    price = None
+    if values["price"] is not None:
+        try:
+            price = Decimal(values["price"].replace(",", "")).quantize(Decimal("0.01"))
+            if not Decimal(0) <= price <= MAX_PRICE:
+                errors.append(f"price out of range: {values['price']}")
+        except InvalidOperation:
+            errors.append(f"price is not a number: {values['price']}")
+
+    stock = None
+    if values["stock"] is not None:
+        try:
+            number = float(values["stock"].replace(",", ""))
+            if not number.is_integer() or number < 0:
+                raise ValueError
+            stock = int(number)
+        except ValueError:
+            errors.append(f"stock must be a whole number of at least 0: {values['stock']}")
+
+    if errors:
+        raise ValueError("; ".join(errors))
+    return (values["name"], values["category"], values["subcategory"], stock, price, values["icon"])
+
+
+def validate_rows(rows):
+    """Split ``read_catalog_rows`` output into loadable tuples and rejects
+    (dicts with ``line``, ``error`` and the original values)"""
+    valid = []
+    rejects = []
+    seen = {}
+    for line, row in rows:
+        try:
+            values = validate_row(row)
+        except ValueError as e:
+            rejects.append(dict(row, line=line, error=str(e)))
+            continue
+        if values[0] in seen:
+            rejects.append(dict(row, line=line, error=f"duplicate of line {seen[values[0]]}"))
+            continue
+        seen[values[0]] = line
+        valid.append(values)
+    return valid, rejects
+
+
+def _load_postgres(pool, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # Unquoted empty fields are NULL to COPY ... (FORMAT csv)
+    writer.writerows(rows)
+    buffer.seek(0)
+
+    with pool.cursor() as cursor:
+        cursor.execute(STAGING_TABLE)
+        cursor.copy_expert(
+            "COPY catalog_staging (name, category, subcategory, stock, price, icon) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+        cursor.execute("ANALYZE catalog_staging")
+        cursor.execute(POSTGRES_UPDATE)
+        updated, stock_changes = cursor.fetchone()
+        cursor.execute(POSTGRES_INSERT)
+        inserted = cursor.rowcount
+    return {"inserted": inserted, "updated": updated, "stock_changes": stock_changes}
+
+
+def _load_sqlite(path, rows):
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(STAGING_TABLE.replace("ON COMMIT DROP", ""))
+            conn.executemany(
+                "INSERT INTO catalog_staging VALUES (?, ?, ?, ?, ?, ?)",
+                [row[:4] + (float(row[4]),) + row[5:] for row in rows]
+            )
+            stock_changes = conn.execute("""
+                INSERT INTO stock_updates (product_id, previous_stock, new_stock, notes)
+                SELECT p.id, p.current_stock, s.stock, 'Catalog import'
+                FROM products AS p
+                JOIN catalog_staging AS s ON s.name = p.name
+                WHERE s.stock IS NOT NULL AND s.stock <> p.current_stock
+            """).rowcount
+            updated = conn.execute(f"""
+                UPDATE products AS p
+                SET category = s.category,
+                    subcategory = COALESCE(s.subcategory, p.subcategory),
+                    current_stock = COALESCE(s.stock, p.current_stock),
+                    price = s.price,
+                    icon = COALESCE(s.icon, p.icon),
+                    updated_at = {SQLITE_NOW}
+                FROM catalog_staging AS s
+                WHERE s.name = p.name
+                  AND (p.category IS NOT s.category
+                       OR p.subcategory IS NOT COALESCE(s.subcategory, p.subcategory)
+                       OR p.current_stock IS NOT COALESCE(s.stock, p.current_stock)
+                       OR p.price IS NOT s.price
+                       OR p.icon IS NOT COALESCE(s.icon, p.icon))
+            """).rowcount
+            inserted = conn.execute("""
+                INSERT INTO products (name, category, subcategory, current_stock, price, icon)
+                SELECT s.name, s.category, s.subcategory, COALESCE(s.stock, 0), s.price, s.icon
+                FROM catalog_staging AS s
+                WHERE NOT EXISTS (SELECT 1 FROM products AS p WHERE p.name = s.name)
+            """).rowcount
+            conn.execute("DROP TABLE catalog_staging")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return {"inserted": inserted, "updated": updated, "stock_changes": stock_changes}
+
+
+def import_catalog(db, path, dry_run=False):
+    """Validate ``path`` and merge its good rows into the catalog.
+
+    ``db`` is a DatabaseManager, a SQLiteDatabaseManager or a
+    ConnectionPool. Returns counts (``rows``, ``inserted``, ``updated``,
+    ``unchanged``, ``stock_changes``) plus the ``rejected`` rows; nothing
+    is written when ``dry_run`` is set.
+    """
+    valid, rejects = validate_rows(read_catalog_rows(path))
+    summary = {"rows": len(valid) + len(rejects), "inserted": 0, "updated": 0, "stock_changes": 0}
+    if valid and not dry_run:
+        if isinstance(db, SQLiteDatabaseManager):
+            summary.update(_load_sqlite(db.path, valid))
+        else:
+            summary.update(_load_postgres(getattr(db, "pool", db), valid))
+    summary["unchanged"] = 0 if dry_run else len(valid) - summary["inserted"] - summary["updated"]
+    summary["rejected"] = rejects
+    return summary
+
+
+def write_rejects(rejects, path):
+    """Rejected rows with their line numbers and errors, as CSV"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=("line", "error") + CATALOG_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rejects)
+
+
+def _export_rows(db):
+    if isinstance(db, SQLiteDatabaseManager):
+        conn = sqlite3.connect(f"file:{os.path.abspath(db.path)}?mode=ro", uri=True)
+        try:
+            yield from conn.execute(EXPORT_QUERY)
+        finally:
+            conn.close()
+        return
+    with getattr(db, "pool", db).cursor() as cursor:
+        cursor.execute(EXPORT_QUERY)
+        yield from cursor
+
+
+def export_catalog(db, path):
+    """Write the whole catalog to ``path`` (.csv or .xlsx) in the import
+    format; returns the number of products"""
+    target = path + ".part"
+    count = 0
+    if path.lower().endswith(".xlsx"):
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Catalog")
+        ws.append(CATALOG_COLUMNS)
+        for row in _export_rows(db):
+            ws.append(row[:4] + (float(row[4]),) + row[5:])
+            count += 1
+        wb.save(target)
+    elif isinstance(db, SQLiteDatabaseManager):
+        with open(target, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CATALOG_COLUMNS)
+            for row in _export_rows(db):
+                # SQLite keeps prices as REAL; match the NUMERIC(10,2) export
+                writer.writerow(row[:4] + (f"{row[4]:.2f}",) + row[5:])
+                count += 1
+    else:
+        # COPY streams the CSV straight from the server
+        with open(target, "w", newline="", encoding="utf-8") as f:
+            with getattr(db, "pool", db).cursor() as cursor:
+                cursor.copy_expert(f"COPY ({EXPORT_QUERY}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+                count = cursor.rowcount
+    os.replace(target, path)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk catalog import/export (CSV or XLSX)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Load products from a file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--dry-run", action="store_true", help="Only validate the file")
+    import_parser.add_argument("--rejects", help="Where to write rejected rows (default: <path>.rejects.csv)")
+    export_parser = commands.add_parser("export", help="Write the catalog to a file")
+    export_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    db = open_database(minconn=1, maxconn=1)
+    start = time.perf_counter()
+    try:
+        if args.command == "export":
+            count = export_catalog(db, args.path)
+            print(f"✅ Exported {count} products to {args.path} in {time.perf_counter() - start:.1f}s")
+            return 0
+        summary = import_catalog(db, args.path, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    rejected = summary["rejected"]
+    if args.dry_run:
+        print(f"🔍 {summary['rows'] - len(rejected)} of {summary['rows']} rows are valid (dry run, nothing written)")
+    else:
+        print(
+            f"✅ Imported {args.path} in {time.perf_counter() - start:.1f}s: {summary['inserted']} new, "
+            f"{summary['updated']} updated, {summary['unchanged']} unchanged, "
+            f"{summary['stock_changes']} stock changes logged"
+        )
+    if rejected:
+        rejects_path = args.rejects or os.path.splitext(args.path)[0] + ".rejects.csv"
+        write_rejects(rejected, rejects_path)
+        print(f"⚠️ {len(rejected)} rows rejected (see {rejects_path}):")
+        for reject in rejected[:10]:
+            print(f"   line {reject['line']}: {reject['error']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,23 @@
+"""The storage backend selected by DB_BACKEND, for the app and the
+command-line tools alike (nothing here imports the UI)."""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def open_database(minconn=None, maxconn=None):
+    """"postgres" (default) for a shared server, or "sqlite" for a single
+    till with a local database file; ``minconn``/``maxconn`` size the
+    PostgreSQL pool"""
+    backend = os.getenv('DB_BACKEND', 'postgres').lower()
+    if backend == 'sqlite':
+        from sqlite_backend import SQLiteDatabaseManager
+        return SQLiteDatabaseManager()
+    if backend == 'postgres':
+        from postgres_backend import DatabaseManager, psycopg2
+        if psycopg2 is None:
+            raise ConnectionError("DB_BACKEND=postgres but psycopg2 is not installed")
+        return DatabaseManager(minconn, maxconn)
+    raise ValueError(f"Unknown DB_BACKEND: {backend}")
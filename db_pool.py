@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from psycopg2 import pool, OperationalError, InterfaceError
+from psycopg2.extensions import TransactionRollbackError
+
+import slow_query_log
+
+
+def get_connection_params():
+    """Connection parameter sets to try, in order of preference"""
+    return [
+        # Primary connection parameters
+        {
+            'dbname': os.getenv('DB_NAME', 'bar_management'),
+            'user': os.getenv('DB_USER', 'postgres'),
+            'password': os.getenv('DB_PASSWORD', 'Ruby1234'),
+            'host': os.getenv('DB_HOST', 'localhost'),
+            'port': os.getenv('DB_PORT', '5432'),
+            'connect_timeout': 5
+        },
+        # Unix socket connection
+        {
+            'dbname': 'bar_management',
+            'user': 'postgres',
+            'host': '/var/run/postgresql'
+        },
+        # Peer authentication
+        {
+            'dbname': 'bar_management',
+            'user': 'postgres',
+            'host': 'localhost'
+        }
+    ]
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections with health checks.
+
+    Connections are checked out per operation with ``connection()`` (or
+    ``cursor()``), committed on success, rolled back on error and returned
+    to the pool. When every connection is busy, callers wait up to
+    ``checkout_timeout`` seconds for one to be returned.
+    """
+
+    def __init__(self, minconn=None, maxconn=None, health_check_interval=None,
+                 checkout_timeout=10, **params):
+        self.minconn = int(minconn if minconn is not None else os.getenv('DB_POOL_MIN', 1))
+        self.maxconn = int(maxconn if maxconn is not None else os.getenv('DB_POOL_MAX', 5))
+        self.health_check_interval = float(
+            health_check_interval if health_check_interval is not None
+            else os.getenv('DB_POOL_HEALTH_CHECK', 30)
+        )
+        self.checkout_timeout = checkout_timeout
+        if slow_query_log.ENABLED:
+            params.setdefault('cursor_factory', slow_query_log.SlowQueryCursor)
+        self.params = params
+        self._pool = pool.ThreadedConnectionPool(self.minconn, self.maxconn, **params)
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+    def _is_healthy(self, conn):
+        """Cheap liveness check, only run on connections idle for a while"""
+        if conn.closed:
+            return False
+        with self._lock:
+            last_used = self._last_used.get(id(conn), 0)
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (OperationalError, InterfaceError):
+            return False
+
+    def getconn(self):
+        """Check out a healthy connection, replacing dead ones"""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise pool.PoolError("Timed out waiting for a free database connection")
+        try:
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                print("⚠️ Discarding broken database connection")
+                self._forget(conn)
+                self._pool.putconn(conn, close=True)
+            raise OperationalError("No healthy database connection available")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool"""
+        try:
+            if close or conn.closed:
+                self._forget(conn)
+                self._pool.putconn(conn, close=True)
+            else:
+                with self._lock:
+                    self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def _forget(self, conn):
+        with self._lock:
+            self._last_used.pop(id(conn), None)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for one unit of work (one transaction)"""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except TransactionRollbackError:
+            # Deadlock or serialization failure: the connection is fine
+            conn.rollback()
+            raise
+        except (OperationalError, InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    @contextmanager
+    def cursor(self):
+        """Shortcut for a pooled connection plus a cursor on it"""
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+
+    def closeall(self):
+        """Close every connection held by the pool"""
+        if not self._pool.closed:
+            self._pool.closeall()
+
+
+def is_connection_error(error):
+    """True when the database itself is unreachable, as opposed to a query
+    that failed (so the work can be kept and retried later)"""
+    if isinstance(error, (InterfaceError, pool.PoolError, ConnectionError)):
+        return True
+    return isinstance(error, OperationalError) and not isinstance(error, TransactionRollbackError)
+
+
+def create_pool(minconn=None, maxconn=None):
+    """Create a pool using the first connection parameter set that works"""
+    for params in get_connection_params():
+        try:
+            connection_pool = ConnectionPool(minconn, maxconn, **params)
+            print(f"✅ Database pool established with params: {params}")
+            return connection_pool
+        except OperationalError as e:
+            print(f"❌ Connection attempt failed with params {params}: {e}")
+
+    raise ConnectionError("Could not establish database connection after multiple attempts")
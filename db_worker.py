@@ -0,0 +1,90 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+
+
+class DatabaseJob:
+    """Handle for a call submitted to the DatabaseWorker"""
+
+    def __init__(self, tag=None, generation=0):
+        self.tag = tag
+        self.generation = generation
+        self.future = None
+        self.cancelled = False
+
+    def cancel(self):
+        """Drop the result; also skips the call if it has not started yet"""
+        self.cancelled = True
+        if self.future:
+            self.future.cancel()
+
+
+class DatabaseWorker:
+    """Runs blocking DatabaseManager calls on background threads.
+
+    Results and errors are delivered on the Kivy main thread through
+    ``Clock.schedule_once``. Jobs submitted with the same ``tag`` supersede
+    each other: only the newest one reports back, so rapid filter changes
+    never paint stale product lists.
+    """
+
+    def __init__(self, max_workers=None, on_busy=None):
+        max_workers = max_workers or int(os.getenv('DB_POOL_MAX', 5))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.on_busy = on_busy
+
+    def submit(self, func, *args, on_success=None, on_error=None, tag=None, **kwargs):
+        """Run ``func(*args, **kwargs)`` in the background (call from the main thread)"""
+        with self._lock:
+            generation = self._generations.get(tag, 0) + 1
+            self._generations[tag] = generation
+        job = DatabaseJob(tag, generation)
+
+        self.pending += 1
+        if self.pending == 1 and self.on_busy:
+            self.on_busy(True)
+
+        job.future = self._executor.submit(func, *args, **kwargs)
+        job.future.add_done_callback(
+            lambda future: Clock.schedule_once(lambda dt: self._deliver(job, future, on_success, on_error))
+        )
+        return job
+
+    def cancel(self, tag):
+        """Discard results of every outstanding job with this tag"""
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def is_current(self, job):
+        if job.cancelled or job.future.cancelled():
+            return False
+        if job.tag is None:
+            return True
+        with self._lock:
+            return self._generations.get(job.tag) == job.generation
+
+    def _deliver(self, job, future, on_success, on_error):
+        self.pending -= 1
+        try:
+            if not self.is_current(job):
+                return
+            error = future.exception()
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    print(f"Background database call failed: {error}")
+            elif on_success:
+                on_success(future.result())
+        finally:
+            if self.pending == 0 and self.on_busy:
+                self.on_busy(False)
+
+    def shutdown(self, wait=False):
+        """Stop accepting work; queued calls that have not started are dropped"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
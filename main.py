@@ -1,265 +1,88 @@
 from kivy.app import App
 from kivy.lang import Builder
 from kivy.uix.boxlayout import BoxLayout
-from kivy.properties import StringProperty, NumericProperty, ListProperty, ObjectProperty
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.properties import StringProperty, NumericProperty, ListProperty, ObjectProperty, BooleanProperty
 from kivy.clock import Clock
-try:
-    from report_generator import generate_report
-except Exception as e:
-    print(f"Report generator not available: {e}")
-    def generate_report(*args, **kwargs):
-        raise ImportError("report_generator or its dependencies are not available")
 import os
 from datetime import datetime
-import psycopg2
-from psycopg2 import sql, OperationalError
+import uuid
 from dotenv import load_dotenv
+from db_backend import open_database
+from postgres_backend import is_connection_error
+from sqlite_backend import is_busy_error
+from db_worker import DatabaseWorker
+from report_worker import ReportWorker
+from bar_config import get_config, calculate_financials
+from catalog_cache import ProductCatalog
+from basket import Basket
+from sales_journal import SalesJournal
+from shifts import save_shift_report
+from stock_history import STOCK_SNAPSHOT_INTERVAL
+import metrics
 import sys
 from kivy.uix.label import Label
+from kivy.uix.popup import Popup
 from kivy.properties import ListProperty
 from kivy.uix.boxlayout import BoxLayout
 
 # Load environment variables
 load_dotenv()
 
-class DatabaseManager:
-    def __init__(self):
-        self.conn = None
-        self.connect()
-
-    def connect(self):
-        """Establish database connection with multiple fallback methods"""
-        connection_params = [
-            # Primary connection parameters
-            {
-                'dbname': os.getenv('DB_NAME', 'bar_management'),
-                'user': os.getenv('DB_USER', 'postgres'),
-                'password': os.getenv('DB_PASSWORD', 'Ruby1234'),
-                'host': os.getenv('DB_HOST', 'localhost'),
-                'port': os.getenv('DB_PORT', '5432'),
-                'connect_timeout': 5
-            },
-            # Unix socket connection
-            {
-                'dbname': 'bar_management',
-                'user': 'postgres',
-                'host': '/var/run/postgresql'
-            },
-            # Peer authentication
-            {
-                'dbname': 'bar_management',
-                'user': 'postgres',
-                'host': 'localhost'
-            }
-        ]
+# Seconds between background catalog delta refreshes
+CATALOG_REFRESH_INTERVAL = int(os.getenv('CATALOG_REFRESH_INTERVAL', 30))
 
-        for params in connection_params:
-            try:
-                self.conn = psycopg2.connect(**params)
-                print(f"✅ Database connection established with params: {params}")
-                self.initialize_database()
-                return
-            except OperationalError as e:
-                print(f"❌ Connection attempt failed with params {params}: {e}")
-        
-        raise ConnectionError("Could not establish database connection after multiple attempts")
+# Seconds of typing inactivity before a search runs
+SEARCH_DEBOUNCE = 0.25
 
-    def initialize_database(self):
-        """Create tables if they don't exist"""
-        try:
-            with self.conn.cursor() as cursor:
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS products (
-                        id SERIAL PRIMARY KEY,
-                        name VARCHAR(255) NOT NULL UNIQUE,
-                        category VARCHAR(100) NOT NULL,
-                        subcategory VARCHAR(100),
-                        current_stock INTEGER NOT NULL,
-                        price DECIMAL(10, 2) NOT NULL,
-                        icon VARCHAR(10),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    );
-                """)
-                
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS sales (
-                        id SERIAL PRIMARY KEY,
-                        product_id INTEGER REFERENCES products(id),
-                        quantity_sold INTEGER NOT NULL,
-                        sale_amount DECIMAL(10, 2) NOT NULL,
-                        sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    );
-                """)
-                
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS stock_updates (
-                        id SERIAL PRIMARY KEY,
-                        product_id INTEGER REFERENCES products(id),
-                        previous_stock INTEGER NOT NULL,
-                        new_stock INTEGER NOT NULL,
-                        update_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        notes TEXT
-                    );
-                """)
-                
-                self.conn.commit()
-        except Exception as e:
-            print(f"Error initializing database: {e}")
-            raise
+# Seconds between attempts to push offline sales to the database
+JOURNAL_REPLAY_INTERVAL = int(os.getenv('JOURNAL_REPLAY_INTERVAL', 15))
 
-    def get_products(self, category="All", subcategory="All"):
-        """Retrieve products with optional filtering"""
-        with self.conn.cursor() as cursor:
-            query = "SELECT name, current_stock, price, category, subcategory, icon FROM products"
-            params = []
-            
-            if category != "All":
-                query += " WHERE category = %s"
-                params.append(category)
-                if subcategory != "All":
-                    query += " AND subcategory = %s"
-                    params.append(subcategory)
-            
-            query += " ORDER BY category, subcategory, name"
-            cursor.execute(query, params)
-            
-            return [{
-                "name": p[0],
-                "stock": p[1],
-                "price": float(p[2]),
-                "category": p[3],
-                "subcategory": p[4],
-                "icon": p[5] if p[5] else "📦"
-            } for p in cursor.fetchall()]
-
-    def get_categories(self):
-        """Get all distinct product categories"""
-        with self.conn.cursor() as cursor:
-            cursor.execute("SELECT DISTINCT category FROM products ORDER BY category")
-            return ["All"] + [row[0] for row in cursor.fetchall()]
-
-    def get_subcategories(self, category):
-        """Get subcategories for a specific category"""
-        with self.conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT DISTINCT subcategory FROM products 
-                WHERE category = %s AND subcategory IS NOT NULL 
-                ORDER BY subcategory
-            """, (category,))
-            return ["All"] + [row[0] for row in cursor.fetchall()]
-
-    def update_stock(self, product_name, quantity_sold):
-        """Update product stock after sale"""
-        with self.conn.cursor() as cursor:
-            try:
-                # Get current stock
-                cursor.execute("""
-                    SELECT id, current_stock FROM products WHERE name = %s
-                    FOR UPDATE
-                """, (product_name,))
-                product = cursor.fetchone()
-                
-                if not product:
-                    return False
-                
-                product_id, current_stock = product
-                new_stock = current_stock - quantity_sold
-                
-                # Update product stock
-                cursor.execute("""
-                    UPDATE products 
-                    SET current_stock = %s, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                """, (new_stock, product_id))
-                
-                # Record the sale
-                sale_amount = quantity_sold * self.get_product_price(product_name)
-                cursor.execute("""
-                    INSERT INTO sales (product_id, quantity_sold, sale_amount)
-                    VALUES (%s, %s, %s)
-                """, (product_id, quantity_sold, sale_amount))
-                
-                # Record stock update
-                cursor.execute("""
-                    INSERT INTO stock_updates 
-                    (product_id, previous_stock, new_stock, notes)
-                    VALUES (%s, %s, %s, %s)
-                """, (product_id, current_stock, new_stock, f"Sold {quantity_sold} items"))
-                
-                self.conn.commit()
-                return True
-            except Exception as e:
-                self.conn.rollback()
-                print(f"Error updating stock: {e}")
-                return False
-
-    def get_product_price(self, product_name):
-        """Get price for a specific product"""
-        with self.conn.cursor() as cursor:
-            cursor.execute("SELECT price FROM products WHERE name = %s", (product_name,))
-            result = cursor.fetchone()
-            return float(result[0]) if result else 0.0
-
-    def add_new_product(self, product_data):
-        """Add a new product to the database"""
-        with self.conn.cursor() as cursor:
-            try:
-                cursor.execute("""
-                    INSERT INTO products 
-                    (name, category, subcategory, current_stock, price, icon)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (name) DO NOTHING
-                """, (
-                    product_data["name"],
-                    product_data["category"],
-                    product_data.get("subcategory"),
-                    product_data["stock"],
-                    product_data["price"],
-                    product_data.get("icon", "📦")
-                ))
-                self.conn.commit()
-                return cursor.rowcount > 0
-            except Exception as e:
-                self.conn.rollback()
-                print(f"Error adding product: {e}")
-                return False
-
-    def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-
-class ProductRow(BoxLayout):
+# Seconds before retrying a database that was unreachable at startup,
+# doubling after each failed attempt up to DB_RECONNECT_MAX_DELAY
+DB_RECONNECT_DELAY = int(os.getenv('DB_RECONNECT_DELAY', 5))
+DB_RECONNECT_MAX_DELAY = int(os.getenv('DB_RECONNECT_MAX_DELAY', 300))
+
+class ProductRow(RecycleDataViewBehavior, BoxLayout):
+    """One visible line of the product list.
+
+    Rows are recycled by the RecycleView as the list scrolls, so a row
+    holds no state of its own: everything it shows comes from its entry in
+    ``products_list.data`` and quantity changes are written back there.
+    """
+    index = None
     product_name = StringProperty("")
     stock = NumericProperty(0)
     price = NumericProperty(0)
     category = StringProperty("")
     subcategory = StringProperty("")
     icon = StringProperty("")
-    
-    def increment_quantity(self):
+    quantity = NumericProperty(0)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.index = index
+        return super().refresh_view_attrs(rv, index, data)
+
+    def set_quantity(self, value):
         try:
-            current = int(self.ids.qty_input.text) if self.ids.qty_input.text else 0
-            if current < self.stock:
-                self.ids.qty_input.text = str(current + 1)
-                self.update_parent_preview()
-        except (ValueError, AttributeError):
-            self.ids.qty_input.text = "0"
+            quantity = int(value) if value not in ("", None) else 0
+        except ValueError:
+            quantity = 0
+        # The int input filter still lets a minus sign through
+        quantity = max(quantity, 0)
+        if quantity == self.quantity:
+            return
+        self.quantity = quantity
+        root = self.get_root_widget()
+        if root is not None and self.index is not None:
+            root.update_quantity(self.index, quantity)
+
+    def increment_quantity(self):
+        if self.quantity < self.stock:
+            self.set_quantity(self.quantity + 1)
     
     def decrement_quantity(self):
-        try:
-            current = int(self.ids.qty_input.text) if self.ids.qty_input.text else 0
-            self.ids.qty_input.text = str(max(0, current - 1))
-            self.update_parent_preview()
-        except (ValueError, AttributeError):
-            self.ids.qty_input.text = "0"
-    
-    def update_parent_preview(self):
-        root = self.get_root_widget()
-        if hasattr(root, 'calculate_preview'):
-            root.calculate_preview()
+        self.set_quantity(max(0, self.quantity - 1))
     
     def get_root_widget(self):
         widget = self
@@ -269,6 +92,20 @@ class ProductRow(BoxLayout):
             widget = widget.parent
         return None
 
+class ConfirmPopup(Popup):
+    """Asks before an action that can't be undone; ``callback`` runs only
+    when the user confirms"""
+    message = StringProperty("")
+    confirm_text = StringProperty("Confirm")
+
+    def __init__(self, callback, **kwargs):
+        super().__init__(**kwargs)
+        self.callback = callback
+
+    def confirm(self):
+        self.dismiss()
+        self.callback()
+
 class AddProductForm(BoxLayout):
     db = ObjectProperty(None)
     
@@ -319,53 +156,162 @@ class SalesForm(BoxLayout):
     categories = ListProperty(["All"])
     subcategories = ListProperty(["All"])
     db = ObjectProperty(None, allownone=True)
+    loading = BooleanProperty(False)
+    report_status = StringProperty("")
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.current_category = "All"
         self.current_subcategory = "All"
-        self.initialized = False
-        
-        # Initialize database connection
+        self.products_data = []
+        self.basket = Basket()
+        self.catalog = None
+        self.search_text = ""
+        self._search_trigger = Clock.create_trigger(self._run_search, SEARCH_DEBOUNCE)
+        self.checkout_in_progress = False
+        self.journal = SalesJournal()
+        self.worker = DatabaseWorker(on_busy=self._set_loading)
+        self.reports = ReportWorker()
+        self._reconnect_delay = DB_RECONNECT_DELAY
+
+        self.connect_database()
+        Clock.schedule_interval(lambda dt: self.replay_journal(), JOURNAL_REPLAY_INTERVAL)
+        if metrics.ENABLED:
+            Clock.schedule_interval(lambda dt: self.export_metrics(), metrics.METRICS_EXPORT_INTERVAL)
+
+    def export_metrics(self):
+        """Rewrite the METRICS_FILE snapshot (only when METRICS_ENABLED)"""
         try:
-            self.db = DatabaseManager()
-            self.categories = self.db.get_categories()
-            self.subcategories = ["All"]
-            Clock.schedule_once(self._delayed_init, 0.1)
-        except Exception as e:
-            print(f"Database initialization failed: {e}")
-            # Fallback to mock data
-            self.products_data = [
-                {"name": "Beer", "category": "Beer", "subcategory": "Local", "stock": 50, "price": 200, "icon": "🍺"},
-                {"name": "Whiskey", "category": "Whiskey", "subcategory": "Imported", "stock": 20, "price": 1000, "icon": "🥃"},
-                {"name": "Vodka", "category": "Vodka", "subcategory": "Imported", "stock": 30, "price": 800, "icon": "🍸"},
-            ]
-            self.categories = ["All", "Beer", "Whiskey", "Vodka"]
-            self.subcategories = ["All", "Local", "Imported"]
-            Clock.schedule_once(self.populate_products, 0.1)
+            metrics.export()
+        except OSError as e:
+            print(f"⚠️ Could not write metrics: {e}")
+
+    def _set_loading(self, busy):
+        self.loading = busy
+
+    def connect_database(self):
+        # Connect in the background so a slow server never freezes the UI
+        self.worker.submit(
+            self._connect_database,
+            tag="connect",
+            on_success=self._on_database_ready,
+            on_error=self._on_database_failed
+        )
+
+    def _connect_database(self):
+        """Runs on a worker thread"""
+        db = open_database()
+        try:
+            catalog = ProductCatalog(db)
+            catalog.load()
+        except Exception:
+            db.close()
+            raise
+        return db, catalog
 
-    def _delayed_init(self, dt):
-        if not self.initialized:
+    def _on_database_ready(self, result):
+        if self._reconnect_delay > DB_RECONNECT_DELAY:
+            print("✅ Database reachable again")
+        self._reconnect_delay = DB_RECONNECT_DELAY
+        self.db, self.catalog = result
+        self.categories = self.catalog.get_categories()
+        self.subcategories = ["All"]
+        self.apply_filters()
+        Clock.schedule_interval(lambda dt: self.refresh_catalog(), CATALOG_REFRESH_INTERVAL)
+        if STOCK_SNAPSHOT_INTERVAL > 0:
+            Clock.schedule_interval(lambda dt: self.snapshot_stock(), STOCK_SNAPSHOT_INTERVAL)
+        self.replay_journal()
+
+    def refresh_catalog(self, repopulate=False):
+        """Pull product changes (e.g. sales on other tills) into the cache"""
+        if not self.catalog:
+            return
+        self.worker.submit(
+            self.catalog.refresh,
+            tag="catalog",
+            on_success=lambda changed: self._on_catalog_refreshed(changed, repopulate),
+            on_error=self._on_database_error
+        )
+
+    def _on_catalog_refreshed(self, changed, repopulate):
+        if changed:
+            self.categories = self.catalog.get_categories()
+        if repopulate:
             self.apply_filters()
-            self.initialized = True
+
+    def snapshot_stock(self):
+        """Checkpoint stock levels so past levels stay quick to look up"""
+        if not self.db:
+            return
+        self.worker.submit(
+            self.db.snapshot_stock,
+            tag="stock_snapshot",
+            on_error=lambda error: print(f"⚠️ Stock snapshot failed: {error}")
+        )
+
+    def replay_journal(self):
+        """Push sales recorded while the database was unreachable"""
+        if not self.db or not self.journal.pending():
+            return
+        self.worker.submit(
+            self.journal.replay,
+            self.db,
+            tag="journal",
+            on_success=self._on_journal_replayed,
+            on_error=lambda error: print(f"⚠️ Offline sales not replayed yet: {error}")
+        )
+
+    def _on_journal_replayed(self, summary):
+        print(f"📒 Journal replay: {summary}")
+        if summary["applied"]:
+            self.refresh_catalog(repopulate=True)
+        if summary["rejected"]:
+            self.show_error(
+                f"⚠️ {summary['rejected']} offline sale(s) were rejected by the database. "
+                f"See {self.journal.path}"
+            )
+
+    def _on_database_failed(self, error):
+        print(f"Database initialization failed: {error}")
+        # Keep trying in the background; once connected, the offline
+        # sales in the journal are replayed
+        print(f"🔁 Retrying the database in {self._reconnect_delay}s")
+        Clock.schedule_once(lambda dt: self.connect_database(), self._reconnect_delay)
+        first_failure = self._reconnect_delay == DB_RECONNECT_DELAY
+        self._reconnect_delay = min(self._reconnect_delay * 2, DB_RECONNECT_MAX_DELAY)
+        if not first_failure:
+            return
+        # Fallback to mock data
+        self.products_data = [
+            {"name": "Beer", "category": "Beer", "subcategory": "Local", "stock": 50, "price": 200, "icon": "🍺"},
+            {"name": "Whiskey", "category": "Whiskey", "subcategory": "Imported", "stock": 20, "price": 1000, "icon": "🥃"},
+            {"name": "Vodka", "category": "Vodka", "subcategory": "Imported", "stock": 30, "price": 800, "icon": "🍸"},
+        ]
+        self.categories = ["All", "Beer", "Whiskey", "Vodka"]
+        self.subcategories = ["All", "Local", "Imported"]
+        self.populate_products()
+
+    def _on_database_error(self, error):
+        self.show_error(f"❌ Database error: {error}")
     
     def update_subcategories(self, category):
         if category == "All":
-            self.subcategories = ["All"]
+            self._set_subcategories(["All"])
+        elif self.catalog:
+            self._set_subcategories(self.catalog.get_subcategories(category))
         else:
-            if self.db:
-                self.subcategories = self.db.get_subcategories(category)
+            # Mock subcategories for fallback
+            if category == "Beer":
+                self._set_subcategories(["All", "Local", "Imported", "Craft"])
+            elif category == "Whiskey":
+                self._set_subcategories(["All", "Scotch", "Bourbon", "Irish"])
+            elif category == "Vodka":
+                self._set_subcategories(["All", "Regular", "Premium", "Flavored"])
             else:
-                # Mock subcategories for fallback
-                if category == "Beer":
-                    self.subcategories = ["All", "Local", "Imported", "Craft"]
-                elif category == "Whiskey":
-                    self.subcategories = ["All", "Scotch", "Bourbon", "Irish"]
-                elif category == "Vodka":
-                    self.subcategories = ["All", "Regular", "Premium", "Flavored"]
-                else:
-                    self.subcategories = ["All"]
-        
+                self._set_subcategories(["All"])
+
+    def _set_subcategories(self, subcategories):
+        self.subcategories = subcategories
         if hasattr(self.ids, 'subcategory_filter'):
             self.ids.subcategory_filter.values = self.subcategories
             self.ids.subcategory_filter.text = "All"
@@ -380,60 +326,58 @@ class SalesForm(BoxLayout):
         self.apply_filters()
     
     def apply_filters(self):
-        if self.db:
-            self.products_data = self.db.get_products(
+        if self.catalog:
+            # In-memory lookup; the catalog is kept fresh by refresh_catalog
+            self.products_data = self.catalog.get_products(
                 category=self.current_category if self.current_category != "All" else "All",
                 subcategory=self.current_subcategory if self.current_subcategory != "All" else "All"
             )
-        # If no db, products_data is already set in __init__
+        # If no db, products_data is already set by the mock fallback
         self.populate_products()
     
+    @metrics.timed("ui_rebuild", view="product_list")
     def populate_products(self, dt=None):
-        if not hasattr(self, 'ids') or not hasattr(self.ids, 'products_grid'):
+        if not hasattr(self, 'ids') or not hasattr(self.ids, 'products_list'):
             Clock.schedule_once(self.populate_products, 0.1)
             return
-            
-        grid = self.ids.products_grid
-        grid.clear_widgets()
-        
+
         for item in self.products_data:
-            row = ProductRow(
-                product_name=item["name"],
-                stock=item["stock"],
-                price=item["price"],
-                category=item["category"],
-                subcategory=item.get("subcategory", ""),
-                icon=item.get("icon", "📦")
-            )
-            grid.add_widget(row)
-        
-        Clock.schedule_once(lambda dt: self.calculate_preview(), 0.1)
+            self.basket.update_product(item)
+
+        # Only the visible rows exist as widgets; this just swaps the data
+        self.ids.products_list.data = [{
+            "product_name": item["name"],
+            "stock": item["stock"],
+            "price": item["price"],
+            "category": item["category"],
+            "subcategory": item.get("subcategory") or "",
+            "icon": item.get("icon", "📦"),
+            "quantity": self.basket.quantity(item["name"])
+        } for item in self.products_data]
+
+        self.calculate_preview()
+
+    def _product_rows(self):
+        """Row data backing the product list"""
+        if not hasattr(self, 'ids') or not hasattr(self.ids, 'products_list'):
+            return []
+        return self.ids.products_list.data
+
+    @metrics.timed("ui_rebuild", view="quantity")
+    def update_quantity(self, index, quantity):
+        """Record a quantity entered on a row; O(1) regardless of catalog size"""
+        self.basket.set_quantity(self.products_data[index], quantity)
+        self._product_rows()[index]["quantity"] = quantity
+        self.calculate_preview()
 
     def calculate_preview(self):
-        if not hasattr(self, 'ids') or not hasattr(self.ids, 'products_grid'):
-            return
-            
-        total_revenue = 0
-        total_items = 0
-        
-        try:
-            for row in self.ids.products_grid.children:
-                if hasattr(row, 'ids') and hasattr(row.ids, 'qty_input'):
-                    qty_text = row.ids.qty_input.text
-                    if qty_text and qty_text.isdigit():
-                        qty_sold = int(qty_text)
-                        total_revenue += qty_sold * row.price
-                        total_items += qty_sold
-        except (ValueError, AttributeError) as e:
-            print(f"Error calculating preview: {e}")
-            
-        self.total_revenue = total_revenue
-        self.total_items_sold = total_items
+        self.total_revenue = self.basket.total_revenue
+        self.total_items_sold = self.basket.total_items
         
         if hasattr(self.ids, 'revenue_preview'):
-            self.ids.revenue_preview.text = f"Ksh {total_revenue:,}"
+            self.ids.revenue_preview.text = f"{get_config().currency} {self.total_revenue:,}"
         if hasattr(self.ids, 'items_preview'):
-            self.ids.items_preview.text = f"{total_items} items"
+            self.ids.items_preview.text = f"{self.total_items_sold} items"
 
     def generate_report(self):
         try:
@@ -441,41 +385,29 @@ class SalesForm(BoxLayout):
             total_sales = 0
             has_sales = False
             
-            for row in self.ids.products_grid.children:
-                qty_sold = 0
-                if hasattr(row, 'ids') and hasattr(row.ids, 'qty_input'):
-                    qty_text = row.ids.qty_input.text
-                    if qty_text and qty_text.isdigit():
-                        qty_sold = int(qty_text)
-                
-                if qty_sold == 0:
-                    continue
-                    
+            # The basket also holds products filtered out of the current view
+            for product, qty_sold in self.basket.lines():
                 has_sales = True
                 
-                if qty_sold > row.stock:
-                    self.show_error(f"❌ {row.product_name}: Quantity ({qty_sold}) exceeds available stock ({row.stock})")
+                if qty_sold > product["stock"]:
+                    self.show_error(f"❌ {product['name']}: Quantity ({qty_sold}) exceeds available stock ({product['stock']})")
                     return
                 
-                sale_amount = qty_sold * row.price
+                sale_amount = qty_sold * product["price"]
                 total_sales += sale_amount
                 
                 data.append({
-                    "Product Name": row.product_name,
-                    "Category": row.category,
-                    "Subcategory": row.subcategory,
-                    "Stock Before": row.stock,
+                    "Product ID": product.get("id"),
+                    "Product Name": product["name"],
+                    "Category": product["category"],
+                    "Subcategory": product.get("subcategory") or "",
+                    "Stock Before": product["stock"],
                     "Quantity Sold": qty_sold,
-                    "Price Per Unit": row.price,
+                    "Price Per Unit": product["price"],
                     "Total Sale": sale_amount,
-                    "Stock After": row.stock - qty_sold
+                    "Stock After": product["stock"] - qty_sold
                 })
                 
-                # Only update stock if we have a database connection
-                if self.db and not self.db.update_stock(row.product_name, qty_sold):
-                    self.show_error(f"❌ Failed to update stock for {row.product_name}")
-                    return
-            
             if not has_sales:
                 self.show_error("❌ No sales data entered. Please add quantities for products sold.")
                 return
@@ -491,42 +423,188 @@ class SalesForm(BoxLayout):
                 except ValueError:
                     self.show_error("❌ Please enter a valid expenditure amount")
                     return
-                
-            report_path = generate_report(data, expenditure)
-
-            config_tax_rate = 0.16  # Default tax rate
-            try:
-                import json
-                with open("bar_config.json", 'r') as f:
-                    config = json.load(f)
-                    config_tax_rate = config.get('tax_rate', 0.16)
-            except:
-                pass
-                
-            tax_amount = total_sales * config_tax_rate
-            net_profit = total_sales - expenditure - tax_amount
+
+            # The rest of the basket is recorded as cash
+            payments = {}
+            mpesa_text = self.ids.mpesa_amount.text if hasattr(self.ids, 'mpesa_amount') else ""
+            if mpesa_text:
+                try:
+                    mpesa_amount = float(mpesa_text)
+                except ValueError:
+                    self.show_error("❌ Please enter a valid M-Pesa amount")
+                    return
+                if mpesa_amount < 0 or mpesa_amount > total_sales:
+                    self.show_error(f"❌ M-Pesa amount must be between 0 and the total ({total_sales:,})")
+                    return
+                payments["mpesa"] = mpesa_amount
+
+            items = [{"name": entry["Product Name"], "quantity": entry["Quantity Sold"]} for entry in data]
+
+            # Only update stock if we have a database connection
+            if self.db:
+                if self.checkout_in_progress:
+                    self.show_error("⏳ Previous sale is still being recorded...")
+                    return
+                self.checkout_in_progress = True
+                self.show_success("⏳ Recording sale...")
+                self.worker.submit(
+                    self._record_sale,
+                    items,
+                    payments,
+                    on_success=lambda result: self._on_sale_recorded(result, data, expenditure, total_sales),
+                    on_error=self._on_sale_failed
+                )
+            else:
+                # Mock catalog (never connected): nothing to record. Once
+                # connected, sales the database can't take are journaled
+                # by _record_sale
+                self._finish_report(data, expenditure, total_sales)
+
+        except ImportError:
+            self.show_error("❌ Error: report_generator.py not found. Make sure it's in the same directory.")
+        except ValueError as ve:
+            self.show_error(f"❌ Input Error: {str(ve)}")
+        except Exception as e:
+            self.show_error(f"❌ Unexpected Error: {str(e)}")
+            print(f"Full error: {e}")
+
+    def _record_sale(self, items, payments=None):
+        """Runs on a worker thread; journals the sale if the database is unreachable"""
+        key = uuid.uuid4().hex
+        try:
+            return self.db.record_sales_batch(items, idempotency_key=key, payments=payments)
+        except Exception as e:
+            if not (is_connection_error(e) or is_busy_error(e)):
+                raise
+            # The sale may or may not have committed; the key makes the
+            # replay a no-op if it did
+            print(f"⚠️ Database unreachable, journaling sale: {e}")
+            self.journal.append(items, key, payments)
+            return {"success": True, "offline": True, "items": [], "failures": [], "total": 0.0}
+
+    def _on_sale_recorded(self, result, data, expenditure, total_sales):
+        self.checkout_in_progress = False
+        if result.get("offline"):
+            print("📒 Sale saved offline; it will be recorded when the database is back")
+        if not result["success"]:
+            failures = "; ".join(
+                f"{failure['name']}: {failure['error']}" if failure["name"] else failure["error"]
+                for failure in result["failures"]
+            )
+            self.show_error(f"❌ Sale not recorded. {failures}")
+            return
+
+        # Use the stock levels the database actually applied
+        recorded = {line["name"]: line for line in result["items"]}
+        for entry in data:
+            line = recorded.get(entry["Product Name"])
+            if line:
+                entry["Product ID"] = line["id"]
+                entry["Stock Before"] = line["previous_stock"]
+                entry["Stock After"] = line["new_stock"]
+
+        if result.get("offline"):
+            self._finish_report(data, expenditure, total_sales)
+            return
+        # Report on the live catalog as it stands right after this sale
+        self.worker.submit(
+            self.db.get_report_products,
+            on_success=lambda products: self._finish_report(data, expenditure, total_sales, products),
+            on_error=lambda error: self._finish_report(data, expenditure, total_sales)
+        )
+
+    def _on_sale_failed(self, error):
+        self.checkout_in_progress = False
+        self.show_error(f"❌ Sale not recorded: {error}")
+
+    def _finish_report(self, data, expenditure, total_sales, products=None):
+        if products is None and self.catalog:
+            products = self.catalog.get_products()
+        try:
+            # The sale is already recorded; the workbook is built in the
+            # background and reports back through _on_report_*
+            # Pin the settings so the report matches the figures shown here
+            config = get_config()
+            settings = dict(config.as_dict(), tax_rate=config.tax_rate)
+            job = self.reports.submit(
+                data, expenditure, products,
+                config=settings,
+                on_progress=self._on_report_progress,
+                on_complete=self._on_report_ready,
+                on_error=self._on_report_failed
+            )
+            self.report_status = f"📄 Report {job.job_id} queued"
+
+            tax_amount, net_profit = calculate_financials(total_sales, expenditure, settings["tax_rate"])
             profit_status = "Profit" if net_profit >= 0 else "Loss"
+            currency = settings["currency"]
             
             self.show_success(
-                f"✅ Report generated successfully!\n"
-                f"📁 File: {os.path.basename(report_path)}\n"
-                f"💰 Gross Sales: Ksh {total_sales:,}\n"
-                f"💳 Expenditure: Ksh {expenditure:,}\n"
-                f"🏛️ Tax (VAT): Ksh {tax_amount:,.2f}\n"
-                f"📊 Net {profit_status}: Ksh {abs(net_profit):,.2f}"
+                f"✅ Sale recorded! Report {job.job_id} is being generated...\n"
+                f"💰 Gross Sales: {currency} {total_sales:,}\n"
+                f"💳 Expenditure: {currency} {expenditure:,}\n"
+                f"🏛️ Tax (VAT): {currency} {tax_amount:,.2f}\n"
+                f"📊 Net {profit_status}: {currency} {abs(net_profit):,.2f}"
             )
             
             self.clear_inputs_only()
-            self.apply_filters()  # Refresh to get updated stock levels
+            self.refresh_catalog(repopulate=True)  # Refresh to get updated stock levels
 
-        except ImportError:
-            self.show_error("❌ Error: report_generator.py not found. Make sure it's in the same directory.")
-        except ValueError as ve:
-            self.show_error(f"❌ Input Error: {str(ve)}")
         except Exception as e:
             self.show_error(f"❌ Unexpected Error: {str(e)}")
             print(f"Full error: {e}")
 
+    def _on_report_progress(self, job, fraction, message):
+        self.report_status = f"📄 Report {job.job_id}: {fraction:.0%} {message}"
+
+    def _on_report_ready(self, job, report_path):
+        self.report_status = f"📁 {os.path.basename(report_path)}"
+        print(f"✅ Report {job.job_id} saved to {report_path}")
+
+    def _on_report_failed(self, job, error):
+        self.report_status = ""
+        self.show_error(f"❌ Report {job.job_id} failed: {error}")
+
+    def x_report(self):
+        """Print the open shift's running totals without closing it"""
+        self._shift_report(lambda: self.db.shift_report(), "X report")
+
+    def z_report(self):
+        """Close the shift and print its final totals, once confirmed"""
+        if not self.db:
+            self.show_error("❌ Z report needs the database")
+            return
+        ConfirmPopup(
+            self._close_shift,
+            title="Close Shift",
+            message="Close the current shift and print its Z report?\nThe next sale opens a new shift.",
+            confirm_text="Close Shift"
+        ).open()
+
+    def _close_shift(self):
+        self._shift_report(lambda: self.db.close_shift(), "Z report")
+
+    def _shift_report(self, fetch, label):
+        if not self.db:
+            self.show_error(f"❌ {label} needs the database")
+            return
+        self.worker.submit(
+            fetch,
+            on_success=lambda report: self._on_shift_report(report, label),
+            on_error=lambda error: self.show_error(f"❌ {label} failed: {error}"),
+            tag="shift"
+        )
+
+    def _on_shift_report(self, report, label):
+        if report is None:
+            self.show_error("❌ No shift is open (one opens with the next sale)")
+            return
+        path = save_shift_report(report, get_config().as_dict())
+        self.show_success(
+            f"🧾 {label} for shift {report['shift_id']}: {get_config().currency} "
+            f"{report['gross_sales']:,.2f} over {report['sale_count']} sales. Saved to {path}"
+        )
+
     def show_success(self, message):
         if hasattr(self.ids, 'status'):
             self.ids.status.text = message
@@ -538,15 +616,17 @@ class SalesForm(BoxLayout):
             self.ids.status.color = (0.9, 0.2, 0.2, 1)
 
     def clear_inputs_only(self):
-        if not hasattr(self.ids, 'products_grid'):
-            return
-            
-        for row in self.ids.products_grid.children:
-            if hasattr(row, 'ids') and hasattr(row.ids, 'qty_input'):
-                row.ids.qty_input.text = ""
+        self.basket.clear()
+        rows = self._product_rows()
+        for row in rows:
+            row["quantity"] = 0
+        if rows:
+            self.ids.products_list.refresh_from_data()
         
         if hasattr(self.ids, 'expenditure'):
             self.ids.expenditure.text = ""
+        if hasattr(self.ids, 'mpesa_amount'):
+            self.ids.mpesa_amount.text = ""
             
         self.calculate_preview()
 
@@ -559,17 +639,15 @@ class SalesForm(BoxLayout):
 
     def quick_fill_sample(self):
         """Fill with sample data for testing"""
-        if not hasattr(self.ids, 'products_grid'):
-            return
-            
         # Sample quantities for first few products
         sample_data = [2, 1, 4, 1, 2, 1, 3, 0, 1, 2]
-        rows = list(reversed(self.ids.products_grid.children))
-        
-        for i, row in enumerate(rows):
-            if i < len(sample_data) and hasattr(row, 'ids') and hasattr(row.ids, 'qty_input'):
-                if sample_data[i] <= row.stock and sample_data[i] > 0:
-                    row.ids.qty_input.text = str(sample_data[i])
+        rows = self._product_rows()
+        for product, row, quantity in zip(self.products_data, rows, sample_data):
+            if quantity <= product["stock"]:
+                self.basket.set_quantity(product, quantity)
+                row["quantity"] = quantity
+        if rows:
+            self.ids.products_list.refresh_from_data()
         
         if hasattr(self.ids, 'expenditure'):
             self.ids.expenditure.text = "2000"
@@ -577,17 +655,24 @@ class SalesForm(BoxLayout):
         self.calculate_preview()
 
     def search_products(self, search_text):
-        """Search products by name"""
-        if not search_text:
+        """Search products as the user types; only the last keystroke in a
+        SEARCH_DEBOUNCE window actually runs a lookup"""
+        self.search_text = search_text.strip()
+        if not self.search_text:
+            self._search_trigger.cancel()
             self.apply_filters()
             return
+        self._search_trigger()
+
+    @metrics.timed("ui_rebuild", view="search")
+    def _run_search(self, dt=None):
+        if not self.search_text:
+            return
             
-        if self.db:
-            all_products = self.db.get_products()
+        if self.catalog:
+            self.products_data = self.catalog.search(self.search_text)
         else:
-            all_products = self.products_data
-            
-        self.products_data = [p for p in all_products if search_text.lower() in p["name"].lower()]
+            self.products_data = [p for p in self.products_data if self.search_text.lower() in p["name"].lower()]
         self.populate_products()
 
 class RubyApp(App):
@@ -605,8 +690,14 @@ class RubyApp(App):
     def on_stop(self):
         # Close database connection when app stops
         root = self.root
+        if hasattr(root, 'worker'):
+            root.worker.shutdown()
+        if hasattr(root, 'reports'):
+            root.reports.shutdown()
         if hasattr(root, 'db') and root.db:
             root.db.close()
+        if hasattr(root, 'export_metrics'):
+            root.export_metrics()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,228 @@
+"""Latency histograms and counters for the database, report and UI paths.
+
+Disabled unless METRICS_ENABLED=1. When disabled, ``timed`` and
+``instrument`` return the original functions and ``timer`` returns a shared
+no-op context manager, so instrumented code pays essentially nothing.
+
+When enabled, METRICS_FILE (``*.prom`` for Prometheus text format,
+anything else for JSON) is rewritten every METRICS_EXPORT_INTERVAL
+seconds by the app, e.g. for the node_exporter textfile collector.
+
+The daily report times each phase as ``report_stage``: ``build``
+(workbook and sales lookup), ``width_fit``, ``summary_rows`` (streaming
+the sales summary, cell styles included), ``financial_sheet``, ``save``
+and ``analytics``.
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+ENABLED = os.getenv('METRICS_ENABLED', '0').lower() in ('1', 'true', 'yes')
+METRICS_FILE = os.getenv('METRICS_FILE', os.path.join('analytics', 'metrics.prom'))
+METRICS_EXPORT_INTERVAL = int(os.getenv('METRICS_EXPORT_INTERVAL', 30))
+
+# Histogram upper bounds in seconds (a final +Inf bucket is implicit)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PREFIX = "bar_"
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+class Registry:
+    """Thread-safe store of histograms and counters keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, seconds, labels=()):
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, value=1, labels=()):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self, reset=False):
+        """JSON-friendly copy of every metric (optionally clearing them)"""
+        with self._lock:
+            data = {
+                "histograms": [
+                    {"name": name, "labels": dict(labels), "buckets": list(h.counts),
+                     "count": h.count, "sum": h.sum}
+                    for (name, labels), h in self.histograms.items()
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ]
+            }
+            if reset:
+                self.histograms = {}
+                self.counters = {}
+        return data
+
+    def merge(self, snapshot):
+        """Add a snapshot taken in another process (e.g. the report worker)"""
+        with self._lock:
+            for entry in snapshot["histograms"]:
+                key = (entry["name"], tuple(sorted(entry["labels"].items())))
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram()
+                histogram.counts = [a + b for a, b in zip(histogram.counts, entry["buckets"])]
+                histogram.count += entry["count"]
+                histogram.sum += entry["sum"]
+            for entry in snapshot["counters"]:
+                key = (entry["name"], tuple(sorted(entry["labels"].items())))
+                self.counters[key] = self.counters.get(key, 0) + entry["value"]
+
+
+REGISTRY = Registry()
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start, self.labels)
+        if exc_type is not None:
+            REGISTRY.increment(f"{self.name}_errors", 1, self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """``with timer("report_stage", stage="save"): ...``"""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, _labels(labels))
+
+
+def timed(name, **labels):
+    """Decorator recording every call of the function under ``name``"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+        key = _labels(labels)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(name, key):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instrument(name, **labels):
+    """Class decorator timing every public method, labelled by method name"""
+    def decorate(cls):
+        if not ENABLED:
+            return cls
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not callable(value):
+                continue
+            setattr(cls, attr, timed(name, method=attr, **labels)(value))
+        return cls
+    return decorate
+
+
+def increment(name, value=1, **labels):
+    if ENABLED:
+        REGISTRY.increment(name, value, _labels(labels))
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels.items()) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in items)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+
+def prometheus_text(snapshot=None):
+    """Metrics in the Prometheus text exposition format"""
+    snapshot = snapshot or REGISTRY.snapshot()
+    lines = []
+    declared = set()
+    for entry in sorted(snapshot["histograms"], key=lambda e: (e["name"], sorted(e["labels"].items()))):
+        metric = f"{PREFIX}{entry['name']}_seconds"
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} histogram")
+            declared.add(metric)
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), entry["buckets"]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{metric}_bucket{_format_labels(entry['labels'], {'le': le})} {cumulative}")
+        lines.append(f"{metric}_sum{_format_labels(entry['labels'])} {entry['sum']}")
+        lines.append(f"{metric}_count{_format_labels(entry['labels'])} {entry['count']}")
+    for entry in sorted(snapshot["counters"], key=lambda e: (e["name"], sorted(e["labels"].items()))):
+        metric = f"{PREFIX}{entry['name']}_total"
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} counter")
+            declared.add(metric)
+        lines.append(f"{metric}{_format_labels(entry['labels'])} {entry['value']}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path=None):
+    """Atomically write the metrics file (Prometheus text or JSON by extension)"""
+    if not ENABLED:
+        return None
+    path = path or METRICS_FILE
+    snapshot = REGISTRY.snapshot()
+    if path.endswith(".prom"):
+        content = prometheus_text(snapshot)
+    else:
+        content = json.dumps(dict(snapshot, bucket_bounds=list(BUCKETS)), indent=2)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    return path
@@ -0,0 +1,456 @@
+"""Versioned schema migrations for the bar_management database.
+
+Each migration runs once, in order, and is recorded in ``schema_migrations``.
+To change the schema, append a new ``(version, description, sql)`` entry to
+``MIGRATIONS`` (and its counterpart to ``SQLITE_MIGRATIONS`` for the embedded
+backend); never edit one that has already shipped.
+"""
+
+# Arbitrary key for pg_advisory_xact_lock so two tills starting at the same
+# time don't both try to migrate
+MIGRATION_LOCK_ID = 741852
+
+MIGRATIONS = [
+    (1, "Base schema", """
+        CREATE TABLE IF NOT EXISTS products (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL UNIQUE,
+            category VARCHAR(100) NOT NULL,
+            subcategory VARCHAR(100),
+            current_stock INTEGER NOT NULL,
+            price DECIMAL(10, 2) NOT NULL,
+            icon VARCHAR(10),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS sales (
+            id SERIAL PRIMARY KEY,
+            product_id INTEGER REFERENCES products(id),
+            quantity_sold INTEGER NOT NULL,
+            sale_amount DECIMAL(10, 2) NOT NULL,
+            sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS stock_updates (
+            id SERIAL PRIMARY KEY,
+            product_id INTEGER REFERENCES products(id),
+            previous_stock INTEGER NOT NULL,
+            new_stock INTEGER NOT NULL,
+            update_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            notes TEXT
+        );
+    """),
+
+    (2, "Reconcile legacy database_setup schema (product_name, no subcategory)", """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_schema = current_schema() AND table_name = 'products'
+                         AND column_name = 'product_name')
+               AND NOT EXISTS (SELECT 1 FROM information_schema.columns
+                               WHERE table_schema = current_schema() AND table_name = 'products'
+                                 AND column_name = 'name') THEN
+                ALTER TABLE products RENAME COLUMN product_name TO name;
+            END IF;
+        END $$;
+
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS subcategory VARCHAR(100);
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS icon VARCHAR(10);
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS current_stock INTEGER;
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+        ALTER TABLE products ALTER COLUMN category TYPE VARCHAR(100);
+
+        UPDATE products SET current_stock = 0 WHERE current_stock IS NULL;
+        ALTER TABLE products ALTER COLUMN current_stock SET DEFAULT 0;
+        ALTER TABLE products ALTER COLUMN current_stock SET NOT NULL;
+        UPDATE products SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL;
+
+        -- The legacy table allowed duplicate names; keep every row (sales
+        -- reference them) but make later duplicates distinguishable
+        UPDATE products AS p SET name = p.name || ' #' || p.id
+        WHERE EXISTS (SELECT 1 FROM products AS q WHERE q.name = p.name AND q.id < p.id);
+        CREATE UNIQUE INDEX IF NOT EXISTS products_name_key ON products (name);
+    """),
+
+    (3, "Indexes for reports, stock history and catalog refresh", """
+        CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales (sale_date);
+        CREATE INDEX IF NOT EXISTS idx_sales_product_id ON sales (product_id);
+        CREATE INDEX IF NOT EXISTS idx_stock_updates_product_date ON stock_updates (product_id, update_date);
+        CREATE INDEX IF NOT EXISTS idx_products_category_subcategory ON products (category, subcategory);
+        CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products (updated_at);
+        ANALYZE products;
+        ANALYZE sales;
+        ANALYZE stock_updates;
+    """),
+
+    (4, "Idempotency keys for replayed checkouts", """
+        CREATE TABLE IF NOT EXISTS sale_batches (
+            idempotency_key VARCHAR(64) PRIMARY KEY,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+
+    (5, "Daily sales rollup, maintained by each checkout", """
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            sale_day DATE NOT NULL,
+            product_id INTEGER NOT NULL REFERENCES products(id),
+            quantity_sold INTEGER NOT NULL DEFAULT 0,
+            sales_amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            sale_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_day, product_id)
+        );
+
+        INSERT INTO sales_daily (sale_day, product_id, quantity_sold, sales_amount, sale_count)
+        SELECT sale_date::date, product_id, SUM(quantity_sold), SUM(sale_amount), COUNT(*)
+        FROM sales
+        WHERE product_id IS NOT NULL
+        GROUP BY sale_date::date, product_id
+        ON CONFLICT (sale_day, product_id) DO NOTHING;
+    """),
+
+    (6, "Shifts with running totals, maintained by each checkout", """
+        CREATE TABLE IF NOT EXISTS shifts (
+            id SERIAL PRIMARY KEY,
+            opened_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            opened_by VARCHAR(100),
+            closed_at TIMESTAMP,
+            closed_by VARCHAR(100)
+        );
+
+        -- At most one open shift at a time
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_shifts_one_open
+            ON shifts ((closed_at IS NULL)) WHERE closed_at IS NULL;
+
+        CREATE TABLE IF NOT EXISTS shift_totals (
+            shift_id INTEGER PRIMARY KEY REFERENCES shifts(id),
+            gross_sales DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            items_sold INTEGER NOT NULL DEFAULT 0,
+            sale_count INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS shift_category_totals (
+            shift_id INTEGER NOT NULL REFERENCES shifts(id),
+            category VARCHAR(100) NOT NULL,
+            quantity_sold INTEGER NOT NULL DEFAULT 0,
+            sales_amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (shift_id, category)
+        );
+
+        CREATE TABLE IF NOT EXISTS shift_payment_totals (
+            shift_id INTEGER NOT NULL REFERENCES shifts(id),
+            method VARCHAR(50) NOT NULL,
+            amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            sale_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (shift_id, method)
+        );
+    """),
+
+    (7, "Stock snapshots for point-in-time stock queries", """
+        CREATE TABLE IF NOT EXISTS stock_snapshots (
+            id SERIAL PRIMARY KEY,
+            product_id INTEGER NOT NULL REFERENCES products(id),
+            snapshot_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            stock INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_stock_snapshots_product_time ON stock_snapshots (product_id, snapshot_at);
+
+        -- Baseline for every existing product
+        INSERT INTO stock_snapshots (product_id, stock)
+        SELECT id, current_stock FROM products;
+    """),
+
+    (8, "Monthly range partitions for sales and stock_updates", """
+        -- Rebuild both logs as tables partitioned by month. Partitions are
+        -- created for every month of existing history and the next few;
+        -- partitions.py adds later months as they approach, and the default
+        -- partitions catch anything outside them.
+        ALTER TABLE sales RENAME TO sales_unpartitioned;
+        ALTER TABLE stock_updates RENAME TO stock_updates_unpartitioned;
+
+        CREATE TABLE sales (
+            id INTEGER NOT NULL,
+            product_id INTEGER REFERENCES products(id),
+            quantity_sold INTEGER NOT NULL,
+            sale_amount DECIMAL(10, 2) NOT NULL,
+            sale_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) PARTITION BY RANGE (sale_date);
+        CREATE TABLE sales_default PARTITION OF sales DEFAULT;
+
+        CREATE TABLE stock_updates (
+            id INTEGER NOT NULL,
+            product_id INTEGER REFERENCES products(id),
+            previous_stock INTEGER NOT NULL,
+            new_stock INTEGER NOT NULL,
+            update_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            notes TEXT
+        ) PARTITION BY RANGE (update_date);
+        CREATE TABLE stock_updates_default PARTITION OF stock_updates DEFAULT;
+
+        DO $$
+        DECLARE
+            parent TEXT;
+            date_column TEXT;
+            id_sequence TEXT;
+            month DATE;
+        BEGIN
+            FOR parent, date_column IN
+                SELECT * FROM (VALUES ('sales', 'sale_date'), ('stock_updates', 'update_date')) AS t
+            LOOP
+                -- Keep handing out ids from the existing sequence
+                id_sequence := pg_get_serial_sequence(parent || '_unpartitioned', 'id');
+                EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', id_sequence, parent);
+                EXECUTE format('ALTER TABLE %I ALTER COLUMN id SET DEFAULT nextval(%L::regclass)',
+                               parent, id_sequence);
+
+                EXECUTE format('SELECT MIN(%I)::date FROM %I', date_column, parent || '_unpartitioned')
+                    INTO month;
+                month := date_trunc('month', LEAST(COALESCE(month, CURRENT_DATE), CURRENT_DATE))::date;
+                WHILE month <= CURRENT_DATE + INTERVAL '3 months' LOOP
+                    EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                                   parent || '_' || to_char(month, 'YYYY_MM'), parent,
+                                   month, (month + INTERVAL '1 month')::date);
+                    month := (month + INTERVAL '1 month')::date;
+                END LOOP;
+            END LOOP;
+        END $$;
+
+        -- Rows written without a date (the app never does) sort first and
+        -- stay in the default partition
+        INSERT INTO sales (id, product_id, quantity_sold, sale_amount, sale_date)
+        SELECT id, product_id, quantity_sold, sale_amount, COALESCE(sale_date, '-infinity')
+        FROM sales_unpartitioned;
+        INSERT INTO stock_updates (id, product_id, previous_stock, new_stock, update_date, notes)
+        SELECT id, product_id, previous_stock, new_stock, COALESCE(update_date, '-infinity'), notes
+        FROM stock_updates_unpartitioned;
+
+        DROP TABLE sales_unpartitioned;
+        DROP TABLE stock_updates_unpartitioned;
+
+        -- The partition key has to be part of the primary key
+        ALTER TABLE sales ADD PRIMARY KEY (id, sale_date);
+        ALTER TABLE stock_updates ADD PRIMARY KEY (id, update_date);
+        CREATE INDEX idx_sales_sale_date ON sales (sale_date);
+        CREATE INDEX idx_sales_product_id ON sales (product_id);
+        CREATE INDEX idx_stock_updates_product_date ON stock_updates (product_id, update_date);
+        ANALYZE sales;
+        ANALYZE stock_updates;
+    """),
+]
+
+
+# Embedded SQLite backend. Versions are tracked in PRAGMA user_version.
+# Timestamps are stored as local-time ISO strings with millisecond precision.
+SQLITE_NOW = "(strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))"
+
+SQLITE_MIGRATIONS = [
+    (1, "Base schema", f"""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            category TEXT NOT NULL,
+            subcategory TEXT,
+            current_stock INTEGER NOT NULL DEFAULT 0,
+            price NUMERIC NOT NULL,
+            icon TEXT,
+            created_at TEXT DEFAULT {SQLITE_NOW},
+            updated_at TEXT DEFAULT {SQLITE_NOW}
+        );
+
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER REFERENCES products(id),
+            quantity_sold INTEGER NOT NULL,
+            sale_amount NUMERIC NOT NULL,
+            sale_date TEXT DEFAULT {SQLITE_NOW}
+        );
+
+        CREATE TABLE IF NOT EXISTS stock_updates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER REFERENCES products(id),
+            previous_stock INTEGER NOT NULL,
+            new_stock INTEGER NOT NULL,
+            update_date TEXT DEFAULT {SQLITE_NOW},
+            notes TEXT
+        );
+    """),
+
+    # Version 2 only reconciles the legacy Postgres schema; nothing to do here
+    (2, "Reconcile legacy schema", ""),
+
+    (3, "Indexes for reports, stock history and catalog refresh", """
+        CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales (sale_date);
+        CREATE INDEX IF NOT EXISTS idx_sales_product_id ON sales (product_id);
+        CREATE INDEX IF NOT EXISTS idx_stock_updates_product_date ON stock_updates (product_id, update_date);
+        CREATE INDEX IF NOT EXISTS idx_products_category_subcategory ON products (category, subcategory);
+        CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products (updated_at);
+    """),
+
+    (4, "Idempotency keys for replayed checkouts", f"""
+        CREATE TABLE IF NOT EXISTS sale_batches (
+            idempotency_key TEXT PRIMARY KEY,
+            recorded_at TEXT DEFAULT {SQLITE_NOW}
+        );
+    """),
+
+    (5, "Daily sales rollup, maintained by each checkout", """
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            sale_day TEXT NOT NULL,
+            product_id INTEGER NOT NULL REFERENCES products(id),
+            quantity_sold INTEGER NOT NULL DEFAULT 0,
+            sales_amount NUMERIC NOT NULL DEFAULT 0,
+            sale_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_day, product_id)
+        );
+
+        INSERT OR IGNORE INTO sales_daily (sale_day, product_id, quantity_sold, sales_amount, sale_count)
+        SELECT date(sale_date), product_id, SUM(quantity_sold), SUM(sale_amount), COUNT(*)
+        FROM sales
+        WHERE product_id IS NOT NULL
+        GROUP BY date(sale_date), product_id;
+    """),
+
+    (6, "Shifts with running totals, maintained by each checkout", f"""
+        CREATE TABLE IF NOT EXISTS shifts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            opened_at TEXT NOT NULL DEFAULT {SQLITE_NOW},
+            opened_by TEXT,
+            closed_at TEXT,
+            closed_by TEXT
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_shifts_one_open
+            ON shifts ((closed_at IS NULL)) WHERE closed_at IS NULL;
+
+        CREATE TABLE IF NOT EXISTS shift_totals (
+            shift_id INTEGER PRIMARY KEY REFERENCES shifts(id),
+            gross_sales NUMERIC NOT NULL DEFAULT 0,
+            items_sold INTEGER NOT NULL DEFAULT 0,
+            sale_count INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS shift_category_totals (
+            shift_id INTEGER NOT NULL REFERENCES shifts(id),
+            category TEXT NOT NULL,
+            quantity_sold INTEGER NOT NULL DEFAULT 0,
+            sales_amount NUMERIC NOT NULL DEFAULT 0,
+            PRIMARY KEY (shift_id, category)
+        );
+
+        CREATE TABLE IF NOT EXISTS shift_payment_totals (
+            shift_id INTEGER NOT NULL REFERENCES shifts(id),
+            method TEXT NOT NULL,
+            amount NUMERIC NOT NULL DEFAULT 0,
+            sale_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (shift_id, method)
+        );
+    """),
+
+    (7, "Stock snapshots for point-in-time stock queries", f"""
+        CREATE TABLE IF NOT EXISTS stock_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL REFERENCES products(id),
+            snapshot_at TEXT NOT NULL DEFAULT {SQLITE_NOW},
+            stock INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_stock_snapshots_product_time ON stock_snapshots (product_id, snapshot_at);
+
+        INSERT INTO stock_snapshots (product_id, stock)
+        SELECT id, current_stock FROM products;
+    """),
+
+    # Version 8 partitions the PostgreSQL logs; SQLite has no partitioning
+    (8, "Monthly range partitions for sales and stock_updates", ""),
+]
+
+
+def get_schema_version(conn):
+    """Highest applied migration version (0 for a fresh database)"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('schema_migrations')")
+        if cursor.fetchone()[0] is None:
+            return 0
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        return cursor.fetchone()[0]
+
+
+def run_migrations(conn):
+    """Apply pending migrations in one transaction; returns the versions applied"""
+    applied_now = []
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+
+            for version, description, statements in MIGRATIONS:
+                if version in applied:
+                    continue
+                print(f"🔧 Applying migration {version}: {description}")
+                cursor.execute(statements)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                applied_now.append(version)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error applying migrations: {e}")
+        raise
+    return applied_now
+
+
+def _split_sqlite_statements(script):
+    """Split a script into complete statements (executescript would commit
+    the surrounding migration transaction)"""
+    import sqlite3
+
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement.strip()
+            statement = ""
+    if statement.strip():
+        yield statement.strip()
+
+
+def run_sqlite_migrations(conn):
+    """SQLite counterpart of run_migrations; ``conn`` must be in autocommit mode"""
+    applied_now = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for migration_version, description, statements in SQLITE_MIGRATIONS:
+            if migration_version <= version:
+                continue
+            print(f"🔧 Applying SQLite migration {migration_version}: {description}")
+            for statement in _split_sqlite_statements(statements):
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(migration_version)}")
+            applied_now.append(migration_version)
+        conn.execute("COMMIT")
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        print(f"Error applying SQLite migrations: {e}")
+        raise
+    return applied_now
+
+
+if __name__ == "__main__":
+    from db_pool import create_pool
+
+    migration_pool = create_pool(minconn=1, maxconn=1)
+    with migration_pool.connection() as conn:
+        versions = run_migrations(conn)
+        print(f"✅ Schema at version {get_schema_version(conn)} ({len(versions)} migration(s) applied)")
+    migration_pool.closeall()
@@ -0,0 +1,270 @@
+"""Monthly partitions of the sales and stock_updates logs (PostgreSQL).
+
+Both tables are range-partitioned by month (migration 8). Every time a
+till starts, ``ensure_partitions`` creates any missing partitions for the
+current month and the next PARTITION_MONTHS_AHEAD, so checkouts always
+land in a month partition; rows that ever end up in the default partition
+are moved out when their month's partition is created.
+
+Old months can be archived: the partition is written to a gzipped CSV in
+PARTITION_ARCHIVE_DIR and then dropped, so vacuum, backups and date-range
+scans only deal with recent months. Reports read the sales_daily rollup
+and are unaffected. ``restore`` loads an archive back and reattaches it
+for historical queries.
+
+    python partitions.py list
+    python partitions.py ensure
+    python partitions.py archive --before 2025-01
+    python partitions.py restore archive/sales_2024_03.csv.gz
+"""
+import argparse
+import gzip
+import os
+import re
+from datetime import date
+
+from psycopg2 import sql
+
+# Partitioned table -> its partition key
+PARTITIONED_TABLES = {"sales": "sale_date", "stock_updates": "update_date"}
+
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+PARTITION_ARCHIVE_DIR = os.getenv('PARTITION_ARCHIVE_DIR', 'archive')
+
+# pg_advisory_xact_lock key so tills starting together don't race to
+# create the same partition
+PARTITION_LOCK_ID = 741853
+
+_PARTITION_NAME = re.compile(r"^(?P<table>\w+)_(?P<year>\d{4})_(?P<month>\d{2})$")
+
+
+def add_months(month, count):
+    """First day of the month ``count`` months after ``month``"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_{month:%Y_%m}"
+
+
+def parse_partition_name(name):
+    """``(table, month)`` for a monthly partition name, else None"""
+    match = _PARTITION_NAME.match(os.path.basename(name).split(".", 1)[0])
+    if not match or match["table"] not in PARTITIONED_TABLES:
+        return None
+    return match["table"], date(int(match["year"]), int(match["month"]), 1)
+
+
+def list_partitions(cursor):
+    """Attached month partitions, oldest first, with estimated row counts
+    and on-disk size"""
+    cursor.execute("""
+        SELECT parent.relname, child.relname, GREATEST(child.reltuples, 0)::bigint,
+               pg_total_relation_size(child.oid)
+        FROM pg_inherits AS i
+        JOIN pg_class AS parent ON parent.oid = i.inhparent
+        JOIN pg_class AS child ON child.oid = i.inhrelid
+        WHERE parent.relname = ANY(%s)
+          AND parent.relnamespace = to_regnamespace(current_schema())
+    """, (list(PARTITIONED_TABLES),))
+    partitions = []
+    for table, name, rows, size in cursor.fetchall():
+        parsed = parse_partition_name(name)
+        if parsed:
+            partitions.append({"table": table, "partition": name, "month": parsed[1], "rows": rows, "bytes": size})
+    return sorted(partitions, key=lambda p: (p["month"], p["table"]))
+
+
+def _create_partition(cursor, table, month):
+    name = partition_name(table, month)
+    column = PARTITIONED_TABLES[table]
+    bounds = (month, add_months(month, 1))
+    cursor.execute(
+        sql.SQL("SELECT EXISTS (SELECT 1 FROM {} WHERE {} >= %s AND {} < %s)").format(
+            sql.Identifier(f"{table}_default"), sql.Identifier(column), sql.Identifier(column)
+        ), bounds
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(
+            sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                sql.Identifier(name), sql.Identifier(table)
+            ), bounds
+        )
+        return
+
+    # The month already has rows in the default partition: move them into
+    # a new table and attach that instead
+    cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+        sql.Identifier(name), sql.Identifier(table)
+    ))
+    cursor.execute(
+        sql.SQL("""
+            WITH moved AS (DELETE FROM {default} WHERE {column} >= %s AND {column} < %s RETURNING *)
+            INSERT INTO {name} SELECT * FROM moved
+        """).format(
+            default=sql.Identifier(f"{table}_default"), column=sql.Identifier(column), name=sql.Identifier(name)
+        ), bounds
+    )
+    print(f"🔧 Moved {cursor.rowcount} {table} rows out of the default partition into {name}")
+    cursor.execute(
+        sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)").format(
+            sql.Identifier(table), sql.Identifier(name)
+        ), bounds
+    )
+
+
+def ensure_partitions(conn, months_ahead=PARTITION_MONTHS_AHEAD, today=None):
+    """Create the missing partitions from the current month through
+    ``months_ahead`` months ahead; returns the names created"""
+    current = (today or date.today()).replace(day=1)
+    wanted = [
+        (table, add_months(current, offset))
+        for offset in range(months_ahead + 1)
+        for table in PARTITIONED_TABLES
+    ]
+    with conn.cursor() as cursor:
+        # Cheap check first so a normal start takes no locks
+        existing = {p["partition"] for p in list_partitions(cursor)}
+        missing = [(table, month) for table, month in wanted if partition_name(table, month) not in existing]
+        if not missing:
+            conn.commit()
+            return []
+
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (PARTITION_LOCK_ID,))
+        existing = {p["partition"] for p in list_partitions(cursor)}
+        created = []
+        try:
+            for table, month in missing:
+                if partition_name(table, month) not in existing:
+                    _create_partition(cursor, table, month)
+                    created.append(partition_name(table, month))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    for name in created:
+        print(f"🔧 Created partition {name}")
+    return created
+
+
+def archive_partition(pool, table, month, archive_dir=PARTITION_ARCHIVE_DIR):
+    """Write one month partition to ``<archive_dir>/<partition>.csv.gz`` and
+    drop it; returns ``(path, rows)``"""
+    name = partition_name(table, month)
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    target = path + ".part"
+    with pool.cursor() as cursor:
+        # Freeze the partition until it is dropped
+        cursor.execute(sql.SQL("LOCK TABLE {} IN SHARE MODE").format(sql.Identifier(name)))
+        with gzip.open(target, "wt", encoding="utf-8", newline="") as f:
+            cursor.copy_expert(
+                sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)").format(sql.Identifier(name)).as_string(cursor),
+                f
+            )
+            rows = cursor.rowcount
+        # The archive must be on disk before the rows are gone
+        with open(target, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(target, path)
+        cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+            sql.Identifier(table), sql.Identifier(name)
+        ))
+        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+    return path, rows
+
+
+def archive_partitions(pool, before, archive_dir=PARTITION_ARCHIVE_DIR):
+    """Archive every month partition older than ``before`` (never the
+    current month); returns ``[(path, rows)]``"""
+    cutoff = min(before.replace(day=1), date.today().replace(day=1))
+    with pool.cursor() as cursor:
+        old = [p for p in list_partitions(cursor) if p["month"] < cutoff]
+    return [archive_partition(pool, p["table"], p["month"], archive_dir) for p in old]
+
+
+def restore_partition(pool, path):
+    """Load an archive written by ``archive_partition`` and reattach it;
+    returns ``(partition, rows)``"""
+    parsed = parse_partition_name(path)
+    if parsed is None:
+        raise ValueError(f"Not a partition archive: {path}")
+    table, month = parsed
+    name = partition_name(table, month)
+    with pool.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", (name,))
+        if cursor.fetchone()[0] is not None:
+            raise ValueError(f"{name} already exists")
+        cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+            sql.Identifier(name), sql.Identifier(table)
+        ))
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            cursor.copy_expert(
+                sql.SQL("COPY {} FROM STDIN WITH (FORMAT csv, HEADER)").format(sql.Identifier(name)).as_string(cursor),
+                f
+            )
+            rows = cursor.rowcount
+        cursor.execute(
+            sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)").format(
+                sql.Identifier(table), sql.Identifier(name)
+            ), (month, add_months(month, 1))
+        )
+        cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(name)))
+    return name, rows
+
+
+def _parse_month(value):
+    year, month = value.split("-")[:2]
+    return date(int(year), int(month), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the monthly sales/stock_updates partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show the attached month partitions")
+    ensure_parser = commands.add_parser("ensure", help="Create partitions for the coming months")
+    ensure_parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    archive_parser = commands.add_parser("archive", help="Archive and drop months before a cutoff")
+    archive_parser.add_argument("--before", required=True, type=_parse_month, help="First month to keep, YYYY-MM")
+    archive_parser.add_argument("--dir", default=PARTITION_ARCHIVE_DIR)
+    restore_parser = commands.add_parser("restore", help="Reattach an archived month")
+    restore_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if os.getenv('DB_BACKEND', 'postgres').lower() == 'sqlite':
+        print("❌ Partitioning is only available on the PostgreSQL backend")
+        return 1
+
+    from db_pool import create_pool
+    pool = create_pool(minconn=1, maxconn=1)
+    try:
+        if args.command == "list":
+            with pool.cursor() as cursor:
+                partitions = list_partitions(cursor)
+            for p in partitions:
+                print(f"  {p['partition']:<28}{p['rows']:>12,} rows {p['bytes'] / 1024 / 1024:>10.1f} MB")
+            print(f"📦 {len(partitions)} month partitions")
+        elif args.command == "ensure":
+            with pool.connection() as conn:
+                created = ensure_partitions(conn, args.months_ahead)
+            print(f"✅ {len(created)} partitions created")
+        elif args.command == "archive":
+            archived = archive_partitions(pool, args.before, args.dir)
+            for path, rows in archived:
+                print(f"🗄️ {rows:,} rows archived to {path}")
+            print(f"✅ {len(archived)} partitions archived")
+        else:
+            try:
+                name, rows = restore_partition(pool, args.path)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+            print(f"✅ Restored {rows:,} rows into {name}")
+    finally:
+        pool.closeall()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
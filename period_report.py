@@ -0,0 +1,48 @@
+"""Sales per day/week/month/year as an Excel report.
+
+Totals come from the sales_daily rollup (``get_sales_summary``), so even
+a year of sales is a small query; the workbook is written by
+``report_generator.generate_period_report`` into the reports folder.
+
+    python period_report.py month --start 2026-01-01 --end 2026-09-30
+    python period_report.py week --by category
+    python period_report.py day --start 2026-10-01 --with-stock
+"""
+import argparse
+from datetime import date
+
+from db_backend import open_database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Excel report of sales per day, week, month or year")
+    parser.add_argument("period", choices=("day", "week", "month", "year"))
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument("--by", choices=("product", "category"), default="product")
+    parser.add_argument("--with-stock", action="store_true",
+                        help="Add each product's stock at the start and end of the period")
+    args = parser.parse_args(argv)
+    if args.with_stock and args.by != "product":
+        parser.error("--with-stock needs --by product")
+
+    from report_generator import generate_period_report
+
+    db = open_database(minconn=1, maxconn=1)
+    try:
+        rows = db.get_sales_summary(args.period, args.start, args.end, by=args.by, with_stock=args.with_stock)
+    finally:
+        db.close()
+    if not rows:
+        print("⚠️ No sales in that range")
+        return 1
+
+    path = generate_period_report(rows, args.period, args.start, args.end)
+    total = sum(row["sales_amount"] for row in rows)
+    print(f"📊 {len(rows)} rows, {sum(row['quantity_sold'] for row in rows)} items, {total:,.2f} in sales")
+    print(f"✅ Report saved to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,630 @@
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+    from psycopg2.extensions import TransactionRollbackError
+    from db_pool import create_pool, is_connection_error
+    from partitions import ensure_partitions
+except ImportError as e:
+    # Tablet builds may ship without the PostgreSQL driver (DB_BACKEND=sqlite)
+    print(f"PostgreSQL driver not available: {e}")
+    psycopg2 = None
+
+    def is_connection_error(error):
+        return isinstance(error, ConnectionError)
+
+import metrics
+from migrations import run_migrations
+from shifts import split_payments, category_totals, build_shift_report
+from stock_history import as_datetime, add_period_stock, build_stock_history
+
+load_dotenv()
+
+# Buckets accepted by get_sales_summary
+SUMMARY_PERIODS = ("day", "week", "month", "year")
+
+# Attempts at a checkout that hits a deadlock or serialization failure,
+# and the base of the randomized backoff between them (seconds)
+SALE_RETRY_ATTEMPTS = int(os.getenv('SALE_RETRY_ATTEMPTS', 3))
+SALE_RETRY_BACKOFF = 0.05
+
+
+@metrics.instrument("db_call", backend="postgres")
+class DatabaseManager:
+    def __init__(self, minconn=None, maxconn=None):
+        self.pool = None
+        self.connect(minconn, maxconn)
+
+    def connect(self, minconn=None, maxconn=None):
+        """Establish the database connection pool with multiple fallback methods"""
+        self.pool = create_pool(minconn, maxconn)
+        self.initialize_database()
+
+    def initialize_database(self):
+        """Bring the schema up to date and create the coming months'
+        sales/stock_updates partitions"""
+        try:
+            with self.pool.connection() as conn:
+                run_migrations(conn)
+                ensure_partitions(conn)
+        except Exception as e:
+            print(f"Error initializing database: {e}")
+            raise
+
+    def get_products(self, category="All", subcategory="All"):
+        """Retrieve products with optional filtering"""
+        with self.pool.cursor() as cursor:
+            query = "SELECT name, current_stock, price, category, subcategory, icon FROM products"
+            params = []
+            
+            if category != "All":
+                query += " WHERE category = %s"
+                params.append(category)
+                if subcategory != "All":
+                    query += " AND subcategory = %s"
+                    params.append(subcategory)
+            
+            query += " ORDER BY category, subcategory, name"
+            cursor.execute(query, params)
+            
+            return [{
+                "name": p[0],
+                "stock": p[1],
+                "price": float(p[2]),
+                "category": p[3],
+                "subcategory": p[4],
+                "icon": p[5] if p[5] else "📦"
+            } for p in cursor.fetchall()]
+
+    def get_products_since(self, since=None):
+        """Retrieve products changed after ``since`` (all products when None)"""
+        with self.pool.cursor() as cursor:
+            query = """
+                SELECT id, name, current_stock, price, category, subcategory, icon, updated_at
+                FROM products
+            """
+            params = []
+            if since is not None:
+                query += " WHERE updated_at > %s"
+                params.append(since)
+            cursor.execute(query, params)
+
+            return [{
+                "id": p[0],
+                "name": p[1],
+                "stock": p[2],
+                "price": float(p[3]),
+                "category": p[4],
+                "subcategory": p[5],
+                "icon": p[6] if p[6] else "📦",
+                "updated_at": p[7]
+            } for p in cursor.fetchall()]
+
+    def get_report_products(self):
+        """Every product with its current stock, in report order"""
+        with self.pool.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, name, category, subcategory, current_stock, price
+                FROM products
+                ORDER BY category, subcategory, name
+            """)
+            return [{
+                "id": p[0],
+                "name": p[1],
+                "category": p[2],
+                "subcategory": p[3],
+                "stock": p[4],
+                "price": float(p[5])
+            } for p in cursor.fetchall()]
+
+    def get_categories(self):
+        """Get all distinct product categories"""
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT category FROM products ORDER BY category")
+            return ["All"] + [row[0] for row in cursor.fetchall()]
+
+    def get_subcategories(self, category):
+        """Get subcategories for a specific category"""
+        with self.pool.cursor() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT subcategory FROM products 
+                WHERE category = %s AND subcategory IS NOT NULL 
+                ORDER BY subcategory
+            """, (category,))
+            return ["All"] + [row[0] for row in cursor.fetchall()]
+
+    def update_stock(self, product_name, quantity_sold):
+        """Update product stock after sale"""
+        return self.record_sales_batch([
+            {"name": product_name, "quantity": quantity_sold}
+        ])["success"]
+
+    def record_sales_batch(self, items, idempotency_key=None, payments=None, created_at=None):
+        """Record a whole basket of sales in a single transaction.
+
+        ``items`` is a list of ``{"name": ..., "quantity": ...}`` dicts.
+        Either every line is applied or none is; the result lists the
+        applied lines with their stock before/after and any per-item
+        failures (unknown product, insufficient stock, bad quantity).
+        A basket whose ``idempotency_key`` was already recorded is not
+        applied again and comes back with ``"duplicate": True``.
+        ``payments`` maps payment methods to amounts (see
+        ``shifts.split_payments``); the sale is added to the open shift's
+        totals in the same transaction. ``created_at`` dates a sale rung up
+        earlier (e.g. replayed from the journal): the sale and its rollup
+        row carry that time and it counts towards the shift that was open
+        then. Its stock updates are logged now, since the stock levels they
+        record are the current ones, with a note saying when it was sold.
+        """
+        return self.record_sales_batches([(idempotency_key, items, payments, created_at)])[0]
+
+    def record_sales_batches(self, baskets):
+        """Record several ``(idempotency_key, items, payments, created_at)`` baskets with one commit.
+
+        Each basket is all-or-nothing on its own (via a savepoint), so one
+        rejected basket doesn't stop the others. A transaction picked as a
+        deadlock or serialization victim is retried up to
+        SALE_RETRY_ATTEMPTS times. Connection errors are raised so callers
+        can keep the baskets for a later retry; any other failure of the
+        whole transaction marks every result ``"transient": True``.
+        """
+        try:
+            return self._retry_transaction(self._record_sales_batches, baskets)
+        except Exception as e:
+            if is_connection_error(e):
+                raise
+            error = e
+
+        print(f"Error recording sales batch: {error}")
+        return [
+            {"success": False, "items": [], "failures": [{"name": None, "error": str(error)}], "total": 0.0,
+             "transient": True}
+            for _ in baskets
+        ]
+
+    def _retry_transaction(self, func, *args):
+        """``func(*args)``, run again when its transaction is picked as a
+        deadlock or serialization victim (up to SALE_RETRY_ATTEMPTS times)"""
+        for attempt in range(1, SALE_RETRY_ATTEMPTS + 1):
+            try:
+                return func(*args)
+            except TransactionRollbackError:
+                if attempt == SALE_RETRY_ATTEMPTS:
+                    raise
+                metrics.increment("sale_retries")
+                time.sleep(random.uniform(0, SALE_RETRY_BACKOFF * 2 ** attempt))
+
+    def _record_sales_batches(self, baskets):
+        results = []
+        with self.pool.cursor() as cursor:
+            for idempotency_key, items, payments, created_at in baskets:
+                if len(baskets) > 1:
+                    cursor.execute("SAVEPOINT basket")
+                try:
+                    result = self._apply_sales_batch(cursor, items, idempotency_key, payments, created_at)
+                except Exception as e:
+                    # Retried or surfaced for the whole batch by the caller
+                    if is_connection_error(e) or isinstance(e, TransactionRollbackError):
+                        raise
+                    # Anything else rejects this basket only
+                    print(f"Error recording basket: {e}")
+                    result = {"success": False, "items": [], "failures": [{"name": None, "error": str(e)}], "total": 0.0}
+                if len(baskets) > 1:
+                    cursor.execute("RELEASE SAVEPOINT basket" if result["success"] else "ROLLBACK TO SAVEPOINT basket")
+                elif not result["success"]:
+                    cursor.connection.rollback()
+                results.append(result)
+        return results
+
+    def _apply_sales_batch(self, cursor, items, idempotency_key=None, payments=None, created_at=None):
+        """Apply one basket inside the caller's transaction"""
+        result = {"success": False, "items": [], "failures": [], "total": 0.0}
+
+        # Merge duplicate lines so each product is touched once
+        quantities = {}
+        for item in items:
+            name = item["name"]
+            quantity = item["quantity"]
+            if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+                result["failures"].append({"name": name, "error": f"Invalid quantity: {quantity}"})
+                continue
+            quantities[name] = quantities.get(name, 0) + quantity
+
+        if result["failures"] or not quantities:
+            if not quantities and not result["failures"]:
+                result["failures"].append({"name": None, "error": "No items to record"})
+            return result
+
+        if idempotency_key:
+            cursor.execute("""
+                INSERT INTO sale_batches (idempotency_key) VALUES (%s)
+                ON CONFLICT (idempotency_key) DO NOTHING
+            """, (idempotency_key,))
+            if cursor.rowcount == 0:
+                result["success"] = True
+                result["duplicate"] = True
+                return result
+
+        # Lock the basket's rows in id order (so two tills selling the same
+        # products can't deadlock) and decrement each one only if it still
+        # has enough stock, all in one statement. A FOR UPDATE CTE is never
+        # inlined, so every row is locked before the update runs.
+        updated = execute_values(cursor, """
+            WITH basket (name, qty) AS (VALUES %s),
+            locked AS (
+                SELECT p.id, b.qty FROM products AS p
+                JOIN basket AS b ON b.name = p.name
+                ORDER BY p.id
+                FOR UPDATE OF p
+            )
+            UPDATE products AS p
+            SET current_stock = p.current_stock - l.qty,
+                updated_at = CURRENT_TIMESTAMP
+            FROM locked AS l
+            WHERE p.id = l.id AND p.current_stock >= l.qty
+            RETURNING p.id, p.name, p.current_stock + l.qty, p.current_stock, l.qty, p.price, p.category
+        """, list(quantities.items()), template="(%s::varchar, %s::integer)", fetch=True)
+
+        if len(updated) < len(quantities):
+            # Explain the rejected lines; the caller rolls the basket back
+            sold = {row[1] for row in updated}
+            missing = [name for name in quantities if name not in sold]
+            cursor.execute("SELECT name, current_stock FROM products WHERE name = ANY(%s)", (missing,))
+            stock = dict(cursor.fetchall())
+            for name in missing:
+                if name not in stock:
+                    result["failures"].append({"name": name, "error": "Product not found"})
+                else:
+                    result["failures"].append({
+                        "name": name,
+                        "error": f"Insufficient stock ({stock[name]} available, {quantities[name]} requested)"
+                    })
+            return result
+
+        lines = []
+        for product_id, name, previous_stock, new_stock, quantity, price, category in updated:
+            sale_amount = quantity * float(price)
+            lines.append({
+                "id": product_id,
+                "name": name,
+                "category": category,
+                "quantity": quantity,
+                "price": float(price),
+                "sale_amount": sale_amount,
+                "previous_stock": previous_stock,
+                "new_stock": new_stock
+            })
+
+        total = sum(line["sale_amount"] for line in lines)
+        payment_splits, error = split_payments(total, payments)
+        if error:
+            result["failures"].append({"name": "Payment", "error": error})
+            return result
+
+        created_at = created_at and as_datetime(created_at)
+        replayed = f" (replayed, sold {created_at:%Y-%m-%d %H:%M})" if created_at else ""
+        execute_values(cursor, """
+            INSERT INTO sales (product_id, quantity_sold, sale_amount, sale_date)
+            VALUES %s
+        """, [
+            (line["id"], line["quantity"], line["sale_amount"], created_at) for line in lines
+        ], template="(%s, %s, %s, COALESCE(%s::timestamp, CURRENT_TIMESTAMP))")
+
+        # Logged now: the levels are the current ones, however old the sale
+        execute_values(cursor, """
+            INSERT INTO stock_updates (product_id, previous_stock, new_stock, notes)
+            VALUES %s
+        """, [
+            (line["id"], line["previous_stock"], line["new_stock"], f"Sold {line['quantity']} items{replayed}")
+            for line in lines
+        ])
+
+        # Keep the daily rollup in step with the raw sales
+        execute_values(cursor, """
+            INSERT INTO sales_daily (sale_day, product_id, quantity_sold, sales_amount, sale_count)
+            VALUES %s
+            ON CONFLICT (sale_day, product_id) DO UPDATE
+            SET quantity_sold = sales_daily.quantity_sold + EXCLUDED.quantity_sold,
+                sales_amount = sales_daily.sales_amount + EXCLUDED.sales_amount,
+                sale_count = sales_daily.sale_count + EXCLUDED.sale_count
+        """, [
+            (created_at, line["id"], line["quantity"], line["sale_amount"]) for line in lines
+        ], template="(COALESCE(%s::date, CURRENT_DATE), %s, %s, %s, 1)")
+
+        self._add_to_shift(cursor, lines, total, payment_splits, created_at)
+
+        result["success"] = True
+        result["items"] = lines
+        result["total"] = total
+        return result
+
+    def _lock_open_shift(self, cursor, opened_by=None):
+        """ID of the open shift, opening one if needed.
+
+        Checkouts share-lock the shift row, so close_shift waits for sales
+        in flight and no sale lands in a shift after its Z report.
+        """
+        cursor.execute("SELECT id FROM shifts WHERE closed_at IS NULL FOR SHARE")
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("""
+                INSERT INTO shifts (opened_by) VALUES (%s)
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            """, (opened_by,))
+            row = cursor.fetchone()
+            if row is not None:
+                cursor.execute("INSERT INTO shift_totals (shift_id) VALUES (%s)", row)
+            else:
+                # Another till opened it first
+                cursor.execute("SELECT id FROM shifts WHERE closed_at IS NULL FOR SHARE")
+                row = cursor.fetchone()
+        return row[0]
+
+    def _sale_shift(self, cursor, created_at=None):
+        """ID of the shift a sale belongs to: the one open at ``created_at``
+        for a sale rung up earlier, otherwise the open shift"""
+        if created_at is not None:
+            cursor.execute("""
+                SELECT id FROM shifts
+                WHERE opened_at <= %s AND (closed_at IS NULL OR closed_at > %s)
+                ORDER BY opened_at DESC LIMIT 1
+                FOR SHARE
+            """, (created_at, created_at))
+            row = cursor.fetchone()
+            if row is not None:
+                return row[0]
+        return self._lock_open_shift(cursor)
+
+    def _add_to_shift(self, cursor, lines, total, payment_splits, created_at=None):
+        """Add a checkout to its shift's running totals"""
+        shift_id = self._sale_shift(cursor, created_at)
+        cursor.execute("""
+            UPDATE shift_totals
+            SET gross_sales = gross_sales + %s,
+                items_sold = items_sold + %s,
+                sale_count = sale_count + 1
+            WHERE shift_id = %s
+        """, (total, sum(line["quantity"] for line in lines), shift_id))
+
+        execute_values(cursor, """
+            INSERT INTO shift_category_totals (shift_id, category, quantity_sold, sales_amount)
+            VALUES %s
+            ON CONFLICT (shift_id, category) DO UPDATE
+            SET quantity_sold = shift_category_totals.quantity_sold + EXCLUDED.quantity_sold,
+                sales_amount = shift_category_totals.sales_amount + EXCLUDED.sales_amount
+        """, [(shift_id,) + row for row in category_totals(lines)])
+
+        if payment_splits:
+            execute_values(cursor, """
+                INSERT INTO shift_payment_totals (shift_id, method, amount, sale_count)
+                VALUES %s
+                ON CONFLICT (shift_id, method) DO UPDATE
+                SET amount = shift_payment_totals.amount + EXCLUDED.amount,
+                    sale_count = shift_payment_totals.sale_count + 1
+            """, [(shift_id, method, amount) for method, amount in payment_splits],
+                template="(%s, %s, %s, 1)")
+
+    def _read_shift_report(self, cursor, shift_id):
+        cursor.execute("""
+            SELECT s.id, s.opened_at, s.opened_by, s.closed_at, s.closed_by,
+                   t.gross_sales, t.items_sold, t.sale_count
+            FROM shifts AS s
+            LEFT JOIN shift_totals AS t ON t.shift_id = s.id
+            WHERE s.id = %s
+        """, (shift_id,))
+        shift = cursor.fetchone()
+        if shift is None:
+            return None
+        cursor.execute("""
+            SELECT category, quantity_sold, sales_amount FROM shift_category_totals
+            WHERE shift_id = %s ORDER BY category
+        """, (shift_id,))
+        categories = cursor.fetchall()
+        cursor.execute("""
+            SELECT method, amount, sale_count FROM shift_payment_totals
+            WHERE shift_id = %s ORDER BY method
+        """, (shift_id,))
+        return build_shift_report(shift, categories, cursor.fetchall())
+
+    def open_shift(self, opened_by=None):
+        """Open a shift (or keep the one already open); returns its report"""
+        with self.pool.cursor() as cursor:
+            return self._read_shift_report(cursor, self._lock_open_shift(cursor, opened_by))
+
+    def shift_report(self, shift_id=None):
+        """X report: running totals of ``shift_id`` (default: the open
+        shift), or None when there is no such shift"""
+        with self.pool.cursor() as cursor:
+            if shift_id is None:
+                cursor.execute("SELECT id FROM shifts WHERE closed_at IS NULL")
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                shift_id = row[0]
+            return self._read_shift_report(cursor, shift_id)
+
+    def close_shift(self, closed_by=None):
+        """Close the open shift and return its final (Z report) totals, or
+        None when no shift is open. The next checkout opens a new shift."""
+        return self._retry_transaction(self._close_shift, closed_by)
+
+    def _close_shift(self, closed_by):
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM shifts WHERE closed_at IS NULL")
+            if cursor.fetchone() is None:
+                return None
+            # Checkpoint stock at the end of every shift. The snapshot locks
+            # products before the shift row is touched, the same order a
+            # checkout takes them in, so the two can't deadlock.
+            self._write_stock_snapshot(cursor)
+            cursor.execute("""
+                UPDATE shifts SET closed_at = CURRENT_TIMESTAMP, closed_by = %s
+                WHERE closed_at IS NULL
+                RETURNING id
+            """, (closed_by,))
+            row = cursor.fetchone()
+            if row is None:
+                # Another till closed it meanwhile; keep the snapshot
+                return None
+            return self._read_shift_report(cursor, row[0])
+
+    def _write_stock_snapshot(self, cursor):
+        """Snapshot the products whose stock may have moved since their last
+        snapshot; returns how many were written"""
+        # FOR SHARE waits for checkouts in flight on these products
+        cursor.execute("""
+            INSERT INTO stock_snapshots (product_id, stock)
+            SELECT p.id, p.current_stock
+            FROM products AS p
+            LEFT JOIN LATERAL (
+                SELECT snapshot_at, stock FROM stock_snapshots
+                WHERE product_id = p.id
+                ORDER BY snapshot_at DESC LIMIT 1
+            ) AS s ON TRUE
+            WHERE s.snapshot_at IS NULL OR p.updated_at > s.snapshot_at OR p.current_stock <> s.stock
+            ORDER BY p.id
+            FOR SHARE OF p
+        """)
+        return cursor.rowcount
+
+    def _stock_at(self, cursor, at, names=None):
+        # The newer of the last snapshot and the last logged change wins;
+        # with neither, the first later change tells what the stock was
+        cursor.execute("""
+            SELECT p.name,
+                   CASE WHEN s.snapshot_at IS NOT NULL
+                             AND (u.update_date IS NULL OR s.snapshot_at >= u.update_date)
+                        THEN s.stock
+                        ELSE COALESCE(u.new_stock, n.previous_stock, p.current_stock)
+                   END
+            FROM products AS p
+            LEFT JOIN LATERAL (
+                SELECT snapshot_at, stock FROM stock_snapshots
+                WHERE product_id = p.id AND snapshot_at <= %(at)s
+                ORDER BY snapshot_at DESC LIMIT 1
+            ) AS s ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT update_date, new_stock FROM stock_updates
+                WHERE product_id = p.id AND update_date <= %(at)s
+                ORDER BY update_date DESC, id DESC LIMIT 1
+            ) AS u ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT previous_stock FROM stock_updates
+                WHERE product_id = p.id AND update_date > %(at)s
+                ORDER BY update_date, id LIMIT 1
+            ) AS n ON TRUE
+            WHERE p.created_at <= %(at)s
+              AND (%(names)s::text[] IS NULL OR p.name = ANY(%(names)s))
+        """, {"at": as_datetime(at), "names": None if names is None else list(names)})
+        return dict(cursor.fetchall())
+
+    def snapshot_stock(self):
+        """Checkpoint current stock levels; returns the number of products
+        snapshotted (unchanged ones are skipped)"""
+        with self.pool.cursor() as cursor:
+            return self._write_stock_snapshot(cursor)
+
+    def stock_at(self, at, names=None):
+        """``{name: stock}`` at ``at`` (datetime, date or ISO string) for the
+        given product names, or every product that existed by then"""
+        with self.pool.cursor() as cursor:
+            return self._stock_at(cursor, at, names)
+
+    def stock_history(self, name, start, end=None):
+        """Opening and closing stock of ``name`` and every logged change
+        between ``start`` and ``end`` (default: now); None if unknown"""
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT id, LOCALTIMESTAMP FROM products WHERE name = %s", (name,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            start = as_datetime(start)
+            end = as_datetime(end) if end is not None else row[1]
+            cursor.execute("""
+                SELECT update_date, previous_stock, new_stock, notes FROM stock_updates
+                WHERE product_id = %s AND update_date > %s AND update_date <= %s
+                ORDER BY update_date, id
+            """, (row[0], start, end))
+            changes = cursor.fetchall()
+            opening = self._stock_at(cursor, start, [name]).get(name)
+            closing = self._stock_at(cursor, end, [name]).get(name)
+        return build_stock_history(name, start, end, opening, closing, changes)
+
+    def get_sales_summary(self, period="day", start=None, end=None, by="product", with_stock=False):
+        """Sales totals per day/week/month/year from the daily rollup.
+
+        Rows are grouped per product (``by="product"``) or per category;
+        ``start`` and ``end`` are inclusive dates. ``with_stock`` adds each
+        product's stock at the start and end of the period.
+        """
+        if period not in SUMMARY_PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        per_product = by == "product"
+        query = f"""
+            SELECT date_trunc(%s, d.sale_day)::date AS period, p.category,
+                   {"p.id, p.name," if per_product else ""}
+                   SUM(d.quantity_sold), SUM(d.sales_amount), SUM(d.sale_count)
+            FROM sales_daily AS d
+            JOIN products AS p ON p.id = d.product_id
+            WHERE (%s::date IS NULL OR d.sale_day >= %s::date)
+              AND (%s::date IS NULL OR d.sale_day <= %s::date)
+            GROUP BY 1, 2{", 3, 4" if per_product else ""}
+            ORDER BY 1, 2{", 4" if per_product else ""}
+        """
+        with self.pool.cursor() as cursor:
+            cursor.execute(query, (period, start, start, end, end))
+            summary = [_summary_row(row, per_product) for row in cursor.fetchall()]
+            if with_stock and per_product:
+                add_period_stock(summary, period, lambda at, names: self._stock_at(cursor, at, names))
+            return summary
+
+    def get_product_price(self, product_name):
+        """Get price for a specific product"""
+        with self.pool.cursor() as cursor:
+            cursor.execute("SELECT price FROM products WHERE name = %s", (product_name,))
+            result = cursor.fetchone()
+            return float(result[0]) if result else 0.0
+
+    def add_new_product(self, product_data):
+        """Add a new product to the database"""
+        try:
+            with self.pool.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO products 
+                    (name, category, subcategory, current_stock, price, icon)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (name) DO NOTHING
+                """, (
+                    product_data["name"],
+                    product_data["category"],
+                    product_data.get("subcategory"),
+                    product_data["stock"],
+                    product_data["price"],
+                    product_data.get("icon", "📦")
+                ))
+                return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error adding product: {e}")
+            return False
+
+    def close(self):
+        """Close all pooled database connections"""
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+
+def _summary_row(row, per_product):
+    summary = {"period": row[0], "category": row[1]}
+    if per_product:
+        summary["product_id"], summary["name"] = row[2], row[3]
+        row = row[2:]
+    summary["quantity_sold"] = int(row[2])
+    summary["sales_amount"] = float(row[3])
+    summary["sale_count"] = int(row[4])
+    return summary
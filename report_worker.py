@@ -0,0 +1,176 @@
+import itertools
+import multiprocessing
+import queue
+import threading
+import traceback
+
+from kivy.clock import Clock
+
+import metrics
+
+# How often the listener checks that the report process is still alive
+POLL_INTERVAL = 0.5
+
+
+def _run_job(job_id, args, kwargs, events):
+    from report_generator import generate_report
+
+    def progress(fraction, message):
+        events.put((job_id, "progress", (fraction, message)))
+
+    try:
+        events.put((job_id, "done", generate_report(*args, progress=progress, **kwargs)))
+    except Exception as e:
+        traceback.print_exc()
+        events.put((job_id, "error", f"{type(e).__name__}: {e}"))
+    finally:
+        # Stage timings recorded in the report process are handed back to
+        # the app's registry (a fallback thread already shares it)
+        if metrics.ENABLED and multiprocessing.parent_process() is not None:
+            events.put((job_id, "metrics", metrics.REGISTRY.snapshot(reset=True)))
+
+
+def _report_process(jobs, events):
+    """Entry point of the report process: build reports until told to stop"""
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        _run_job(*job, events)
+
+
+class ReportJob:
+    """Handle for a report submitted to the ReportWorker"""
+
+    def __init__(self, job_id, on_progress=None, on_complete=None, on_error=None):
+        self.job_id = job_id
+        self.status = "queued"
+        self.progress = 0.0
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.on_error = on_error
+
+
+class ReportWorker:
+    """Builds Excel reports in a separate process so the UI never waits on
+    openpyxl.
+
+    Reports are queued and built one after another; each gets a job ID and
+    its progress, completion and errors are delivered on the Kivy main
+    thread. Where multiprocessing is unavailable (some Android builds) the
+    same queue is served by a background thread instead.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._process = None
+        self._stopping = False
+        try:
+            context = multiprocessing.get_context("spawn")
+            self._job_queue = context.Queue()
+            self._events = context.Queue()
+            self._context = context
+        except (ImportError, OSError) as e:
+            print(f"⚠️ Report process unavailable, building reports on a thread: {e}")
+            self._job_queue = queue.Queue()
+            self._events = queue.Queue()
+            self._context = None
+        self._listener = threading.Thread(target=self._listen, name="report-listener", daemon=True)
+        self._listener.start()
+
+    def _ensure_started(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        if self._context is not None:
+            self._process = self._context.Process(
+                target=_report_process, args=(self._job_queue, self._events),
+                name="report-worker", daemon=True
+            )
+        else:
+            self._process = threading.Thread(
+                target=_report_process, args=(self._job_queue, self._events),
+                name="report-worker", daemon=True
+            )
+        self._process.start()
+
+    def submit(self, *args, on_progress=None, on_complete=None, on_error=None, **kwargs):
+        """Queue a report (call from the main thread); returns its ReportJob.
+
+        ``args`` and ``kwargs`` are passed to ``report_generator.generate_report``.
+        """
+        job = ReportJob(next(self._ids), on_progress, on_complete, on_error)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._ensure_started()
+        self._job_queue.put((job.job_id, args, kwargs))
+        return job
+
+    def pending(self):
+        with self._lock:
+            return [job for job in self._jobs.values() if job.status in ("queued", "running")]
+
+    def _listen(self):
+        while not self._stopping:
+            try:
+                job_id, kind, payload = self._events.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                self._check_process()
+                continue
+            except (EOFError, OSError):
+                return
+            if kind == "metrics":
+                metrics.REGISTRY.merge(payload)
+                continue
+            Clock.schedule_once(lambda dt, event=(job_id, kind, payload): self._deliver(*event))
+
+    def _check_process(self):
+        """Fail the outstanding jobs if the report process died under them"""
+        with self._lock:
+            if self._process is None or self._process.is_alive():
+                return
+            lost = [job for job in self._jobs.values() if job.status in ("queued", "running")]
+            self._process = None
+            if lost:
+                # Anything still queued would be picked up by a new process,
+                # but its position is unknown; start clean instead
+                self._job_queue = self._context.Queue() if self._context else queue.Queue()
+        for job in lost:
+            Clock.schedule_once(
+                lambda dt, job_id=job.job_id: self._deliver(job_id, "error", "Report process exited unexpectedly")
+            )
+
+    def _deliver(self, job_id, kind, payload):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in ("done", "failed"):
+                return
+            if kind != "progress":
+                del self._jobs[job_id]
+
+        if kind == "progress":
+            job.status = "running"
+            job.progress, message = payload
+            if job.on_progress:
+                job.on_progress(job, job.progress, message)
+        elif kind == "done":
+            job.status = "done"
+            job.progress = 1.0
+            if job.on_complete:
+                job.on_complete(job, payload)
+        else:
+            job.status = "failed"
+            if job.on_error:
+                job.on_error(job, payload)
+            else:
+                print(f"Report {job_id} failed: {payload}")
+
+    def shutdown(self, timeout=5):
+        """Let queued reports finish (up to ``timeout`` seconds), then stop"""
+        self._job_queue.put(None)
+        if self._process is not None:
+            self._process.join(timeout)
+            if self._context is not None and self._process.is_alive():
+                self._process.terminate()
+        self._stopping = True
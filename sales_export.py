@@ -0,0 +1,176 @@
+"""Streaming export of sales history to CSV or JSON Lines.
+
+Rows are read in ``fetchmany`` batches (through a server-side cursor on
+PostgreSQL) and written out as they arrive, so memory use does not depend
+on the size of the date range.
+
+    python sales_export.py sales_2025.csv.gz --start 2025-01-01 --end 2025-12-31
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import uuid
+from datetime import date, timedelta
+
+from db_backend import open_database
+from sqlite_backend import SQLiteDatabaseManager
+
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = (
+    "sale_id", "sale_date", "product_id", "product_name", "category",
+    "subcategory", "quantity_sold", "unit_price", "sale_amount"
+)
+
+EXPORT_QUERY = """
+    SELECT s.id, s.sale_date, s.product_id, p.name, p.category, p.subcategory,
+           s.quantity_sold, s.sale_amount
+    FROM sales AS s
+    LEFT JOIN products AS p ON p.id = s.product_id
+    WHERE ({placeholder} IS NULL OR s.sale_date >= {placeholder})
+      AND ({placeholder} IS NULL OR s.sale_date < {placeholder})
+    ORDER BY s.sale_date, s.id
+"""
+
+
+def _bounds(start, end):
+    """Inclusive dates to a half-open [start, end + 1 day) range"""
+    return start, (end + timedelta(days=1)) if end else None
+
+
+def _export_row(row):
+    sale_id, sale_date, product_id, name, category, subcategory, quantity, amount = row
+    amount = float(amount)
+    return {
+        "sale_id": sale_id,
+        "sale_date": sale_date if isinstance(sale_date, str) else sale_date.isoformat(sep=" "),
+        "product_id": product_id,
+        "product_name": name,
+        "category": category,
+        "subcategory": subcategory,
+        "quantity_sold": quantity,
+        "unit_price": round(amount / quantity, 2) if quantity else 0.0,
+        "sale_amount": amount
+    }
+
+
+def _iter_postgres(pool, start, end, batch_size):
+    start, end = _bounds(start, end)
+    with pool.connection() as conn:
+        # Named cursor: the server holds the result set and hands it over
+        # one batch at a time
+        with conn.cursor(name=f"sales_export_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(
+                EXPORT_QUERY.format(placeholder="%s::timestamp"),
+                (start, start, end, end)
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _export_row(row)
+
+
+def _iter_sqlite(path, start, end, batch_size):
+    start, end = _bounds(start, end)
+    start = start.isoformat() if start else None
+    end = end.isoformat() if end else None
+    # Separate read-only connection; WAL gives it a consistent snapshot
+    # without blocking checkouts
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(EXPORT_QUERY.format(placeholder="?"), (start, start, end, end))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield _export_row(row)
+    finally:
+        conn.close()
+
+
+def iter_sales(db, start=None, end=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield sales between ``start`` and ``end`` (inclusive dates) as dicts.
+
+    ``db`` is a DatabaseManager, a SQLiteDatabaseManager or a ConnectionPool.
+    """
+    if isinstance(db, SQLiteDatabaseManager):
+        return _iter_sqlite(db.path, start, end, batch_size)
+    return _iter_postgres(getattr(db, "pool", db), start, end, batch_size)
+
+
+def _open_output(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def export_sales(db, path, fmt=None, start=None, end=None, compress=None, batch_size=EXPORT_BATCH_SIZE):
+    """Write sales to ``path`` as CSV or JSON Lines; returns the row count.
+
+    The format and gzip compression default from the file name
+    (``.csv``, ``.jsonl``, optionally followed by ``.gz``). The file is
+    written under a temporary name and only renamed into place once
+    complete.
+    """
+    base = path[:-3] if path.endswith(".gz") else path
+    if compress is None:
+        compress = path.endswith(".gz")
+    if fmt is None:
+        fmt = "jsonl" if base.endswith((".jsonl", ".json")) else "csv"
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    target = path + ".part"
+    count = 0
+    out = _open_output(target, compress)
+    try:
+        if fmt == "csv":
+            writer = csv.DictWriter(out, fieldnames=EXPORT_COLUMNS)
+            writer.writeheader()
+            for row in iter_sales(db, start, end, batch_size):
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in iter_sales(db, start, end, batch_size):
+                out.write(json.dumps(row) + "\n")
+                count += 1
+    except BaseException:
+        out.close()
+        os.remove(target)
+        raise
+
+    out.close()
+    os.replace(target, path)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export sales history as CSV or JSON Lines")
+    parser.add_argument("output", help="Output file (.csv, .jsonl, optionally .gz)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="Defaults from the file name")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument("--gzip", action="store_true", default=None, help="Compress the output")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    db = open_database(minconn=1, maxconn=1)
+    try:
+        count = export_sales(
+            db, args.output, fmt=args.format, start=args.start, end=args.end,
+            compress=args.gzip, batch_size=args.batch_size
+        )
+    finally:
+        db.close()
+    print(f"✅ Exported {count} sales to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
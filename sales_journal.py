@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+JOURNAL_DIR = "journal"
+JOURNAL_FILE = os.path.join(JOURNAL_DIR, "sales_journal.jsonl")
+
+# Baskets replayed per database transaction
+REPLAY_BATCH_SIZE = 200
+
+
+def _is_transaction_error(result):
+    """True when the batch's transaction failed as a whole (see
+    record_sales_batches), not when the database refused the sale"""
+    return not result["success"] and result.get("transient", False)
+
+
+class SalesJournal:
+    """Append-only, fsync'd log of checkouts the database has not confirmed.
+
+    Each checkout is written as a ``sale`` line with an idempotency key
+    before the till moves on; ``replay()`` later sends pending sales to the
+    database in large batches and appends an ``ack`` line per sale. The
+    database ignores keys it has already seen, so a crash between commit
+    and ack can never double-count a sale. A replayed sale keeps the time it
+    was rung up, so it lands on that day and in that shift (its stock
+    change is logged at replay time). Sales the database rejects (e.g. a
+    product deleted meanwhile) stay in the journal for manual review.
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._status = {}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash mid-write; the sale was
+                        # never confirmed to the user, so it is safe to drop
+                        continue
+                    if record["type"] == "sale":
+                        self._entries[record["key"]] = record
+                    elif record["type"] == "ack":
+                        self._status[record["key"]] = record
+        except FileNotFoundError:
+            pass
+
+    def _write(self, records):
+        """Append records and force them to disk before returning"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, items, key=None, payments=None):
+        """Durably journal a checkout; returns its idempotency key"""
+        record = {
+            "type": "sale",
+            "key": key or uuid.uuid4().hex,
+            "items": [{"name": item["name"], "quantity": item["quantity"]} for item in items],
+            "created_at": datetime.now().isoformat()
+        }
+        if payments:
+            record["payments"] = payments
+        with self._lock:
+            self._write([record])
+            self._entries[record["key"]] = record
+        return record["key"]
+
+    def pending(self):
+        """Journaled sales not yet acknowledged by the database, oldest first"""
+        with self._lock:
+            return [entry for key, entry in self._entries.items() if key not in self._status]
+
+    def rejected(self):
+        """Sales the database refused, with the reasons"""
+        with self._lock:
+            return [
+                dict(self._entries[key], errors=ack.get("errors", []))
+                for key, ack in self._status.items()
+                if ack["status"] == "rejected" and key in self._entries
+            ]
+
+    def replay(self, db, batch_size=REPLAY_BATCH_SIZE):
+        """Send pending sales to the database; returns counts per outcome.
+
+        Connection errors propagate and leave the remaining sales pending.
+        """
+        summary = {"applied": 0, "duplicate": 0, "rejected": 0}
+        pending = self.pending()
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            results = db.record_sales_batches([
+                (entry["key"], entry["items"], entry.get("payments"), entry.get("created_at"))
+                for entry in chunk
+            ])
+
+            if all(_is_transaction_error(result) for result in results):
+                # The database failed as a whole rather than refusing these
+                # sales; keep everything pending and retry later
+                break
+
+            acks = []
+            for entry, result in zip(chunk, results):
+                if result["success"]:
+                    status = "duplicate" if result.get("duplicate") else "applied"
+                else:
+                    status = "rejected"
+                acks.append({
+                    "type": "ack",
+                    "key": entry["key"],
+                    "status": status,
+                    "errors": result["failures"],
+                    "acked_at": datetime.now().isoformat()
+                })
+                summary[status] += 1
+
+            with self._lock:
+                self._write(acks)
+                for ack in acks:
+                    self._status[ack["key"]] = ack
+
+        if not self.pending():
+            self.compact()
+        return summary
+
+    def compact(self):
+        """Atomically rewrite the journal keeping only pending and rejected sales"""
+        with self._lock:
+            keep = [
+                key for key, entry in self._entries.items()
+                if key not in self._status or self._status[key]["status"] == "rejected"
+            ]
+            if len(keep) == len(self._entries):
+                return
+            records = [self._entries[key] for key in keep]
+            records += [self._status[key] for key in keep if key in self._status]
+
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            if hasattr(os, 'O_DIRECTORY'):
+                dir_fd = os.open(os.path.dirname(self.path) or ".", os.O_DIRECTORY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+
+            self._entries = {key: self._entries[key] for key in keep}
+            self._status = {key: self._status[key] for key in keep if key in self._status}
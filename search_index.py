@@ -0,0 +1,162 @@
+import re
+from bisect import bisect_left, insort
+
+# Minimum trigram similarity for a fuzzy (typo) match
+FUZZY_THRESHOLD = 0.35
+
+# How much each product field counts towards the score
+FIELD_WEIGHTS = {"name": 1.0, "subcategory": 0.6, "category": 0.5}
+
+# Score for each kind of token match, before field weighting
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.7
+
+_TOKEN_RE = re.compile(r"[a-z0-9%&/.]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens of a product field"""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (transpositions count as one edit),
+    giving up early once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def trigrams(token):
+    """Space-padded trigrams, so word starts and ends count too"""
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    """Token, prefix and trigram index over product names and categories.
+
+    ``search()`` ranks products by how well every query word matches one of
+    their words: exact beats prefix ("guin" -> GUINNESS) beats trigram
+    similarity, which absorbs typos such as "GUINESS" or "JEGERMISTER".
+    """
+
+    def __init__(self, products=()):
+        self._products = {}
+        self._fields = {}       # product id -> {token: best field weight}
+        self._postings = {}     # token -> {product id}
+        self._vocabulary = []   # sorted tokens, for prefix scans
+        self._grams = {}        # trigram -> {token}
+        for product in products:
+            self.add(product)
+
+    def __len__(self):
+        return len(self._products)
+
+    def add(self, product):
+        """Index a product, replacing any previous version of it"""
+        product_id = product.get("id", product["name"])
+        if product_id in self._products:
+            self.remove(product_id)
+
+        fields = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(product.get(field)):
+                fields[token] = max(fields.get(token, 0), weight)
+
+        self._products[product_id] = product
+        self._fields[product_id] = fields
+        for token in fields:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                insort(self._vocabulary, token)
+                for gram in trigrams(token):
+                    self._grams.setdefault(gram, set()).add(token)
+            postings.add(product_id)
+
+    def remove(self, product_id):
+        """Drop a product from the index"""
+        self._products.pop(product_id, None)
+        for token in self._fields.pop(product_id, {}):
+            postings = self._postings[token]
+            postings.discard(product_id)
+            if postings:
+                continue
+            del self._postings[token]
+            del self._vocabulary[bisect_left(self._vocabulary, token)]
+            for gram in trigrams(token):
+                tokens = self._grams[gram]
+                tokens.discard(token)
+                if not tokens:
+                    del self._grams[gram]
+
+    def _candidates(self, word):
+        """Vocabulary tokens matching a query word, with their match score"""
+        matches = {}
+        if word in self._postings:
+            matches[word] = EXACT_SCORE
+
+        i = bisect_left(self._vocabulary, word)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(word):
+            token = self._vocabulary[i]
+            matches.setdefault(token, PREFIX_SCORE)
+            i += 1
+
+        word_grams = trigrams(word)
+        shared = {}
+        for gram in word_grams:
+            for token in self._grams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        max_edits = 1 if len(word) <= 5 else 2
+        for token, count in shared.items():
+            similarity = count / (len(word_grams) + len(trigrams(token)) - count)
+            if similarity < FUZZY_THRESHOLD and len(word) >= 4:
+                # Swapped letters ("captian") break too many trigrams; fall
+                # back to a bounded edit distance for those
+                distance = edit_distance(word, token, max_edits)
+                if distance <= max_edits:
+                    similarity = 1 - distance / max(len(word), len(token))
+            if similarity >= FUZZY_THRESHOLD:
+                score = FUZZY_SCORE * similarity
+                if score > matches.get(token, 0):
+                    matches[token] = score
+        return matches
+
+    def search(self, text, limit=None):
+        """Products matching every word of ``text``, best match first"""
+        words = tokenize(text)
+        if not words:
+            return []
+
+        scores = None
+        for word in words:
+            word_scores = {}
+            for token, score in self._candidates(word).items():
+                for product_id in self._postings[token]:
+                    weighted = score * self._fields[product_id][token]
+                    if weighted > word_scores.get(product_id, 0):
+                        word_scores[product_id] = weighted
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {pid: scores[pid] + s for pid, s in word_scores.items() if pid in scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self._products[item[0]]["name"]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self._products[product_id] for product_id, _ in ranked]
@@ -0,0 +1,122 @@
+"""Shift (till session) totals shared by both database backends.
+
+Every checkout adds to the open shift's running totals in the same
+transaction as the sale, opening a shift first if none is open. X reports
+(a mid-shift read) and Z reports (closing the shift) are therefore a few
+primary-key reads however many sales the shift had.
+"""
+import os
+from datetime import datetime
+
+# Whatever part of a basket the ``payments`` of a checkout leave uncovered
+DEFAULT_PAYMENT_METHOD = "cash"
+
+SHIFT_REPORT_DIR = "reports"
+
+
+def split_payments(total, payments=None):
+    """Amount per payment method for a basket worth ``total``.
+
+    ``payments`` maps methods to amounts (e.g. ``{"mpesa": 300}``); the
+    remainder is DEFAULT_PAYMENT_METHOD. Returns ``(splits, error)`` where
+    ``splits`` is a sorted list of ``(method, amount)`` and ``error`` is a
+    message when the payments are invalid or exceed the total.
+    """
+    amounts = {}
+    for method, amount in (payments or {}).items():
+        try:
+            amount = round(float(amount), 2)
+        except (TypeError, ValueError):
+            return [], f"Invalid {method} amount: {amount}"
+        if amount < 0:
+            return [], f"{method} amount cannot be negative"
+        if amount:
+            method = str(method).strip().lower()
+            amounts[method] = amounts.get(method, 0.0) + amount
+
+    remainder = round(total - sum(amounts.values()), 2)
+    if remainder < 0:
+        return [], f"Payments ({sum(amounts.values()):,.2f}) exceed the basket total ({total:,.2f})"
+    if remainder:
+        amounts[DEFAULT_PAYMENT_METHOD] = round(amounts.get(DEFAULT_PAYMENT_METHOD, 0.0) + remainder, 2)
+    return sorted(amounts.items()), None
+
+
+def category_totals(lines):
+    """``(category, quantity, amount)`` per category of recorded sale lines,
+    sorted so concurrent checkouts update the rows in the same order"""
+    totals = {}
+    for line in lines:
+        quantity, amount = totals.get(line["category"], (0, 0.0))
+        totals[line["category"]] = (quantity + line["quantity"], amount + line["sale_amount"])
+    return [(category, quantity, amount) for category, (quantity, amount) in sorted(totals.items())]
+
+
+def build_shift_report(shift, categories, payments):
+    """Report dict from a ``(id, opened_at, opened_by, closed_at,
+    closed_by, gross_sales, items_sold, sale_count)`` row and the shift's
+    category and payment rows"""
+    shift_id, opened_at, opened_by, closed_at, closed_by, gross_sales, items_sold, sale_count = shift
+    return {
+        "shift_id": shift_id,
+        "status": "open" if closed_at is None else "closed",
+        "opened_at": opened_at,
+        "opened_by": opened_by,
+        "closed_at": closed_at,
+        "closed_by": closed_by,
+        "gross_sales": float(gross_sales or 0),
+        "items_sold": int(items_sold or 0),
+        "sale_count": int(sale_count or 0),
+        "categories": [
+            {"category": category, "quantity_sold": int(quantity), "sales_amount": float(amount)}
+            for category, quantity, amount in categories
+        ],
+        "payments": [
+            {"method": method, "amount": float(amount), "sale_count": int(count)}
+            for method, amount, count in payments
+        ]
+    }
+
+
+def _timestamp(value):
+    return value.strftime("%Y-%m-%d %H:%M") if value else "-"
+
+
+def format_shift_report(report, config):
+    """Printable X report (open shift) or Z report (closed shift)"""
+    currency = config["currency"]
+    kind = "X REPORT" if report["status"] == "open" else f"Z REPORT #{report['shift_id']}"
+    lines = [
+        config["bar_name"],
+        kind,
+        f"Shift {report['shift_id']}",
+        f"Opened: {_timestamp(report['opened_at'])} {report['opened_by'] or ''}".rstrip(),
+        f"Closed: {_timestamp(report['closed_at'])} {report['closed_by'] or ''}".rstrip(),
+        "-" * 40,
+        f"{'Gross sales':<24}{currency} {report['gross_sales']:>12,.2f}",
+        f"{'Items sold':<24}{report['items_sold']:>16}",
+        f"{'Transactions':<24}{report['sale_count']:>16}",
+        "-" * 40,
+        "By category"
+    ]
+    for row in report["categories"]:
+        lines.append(f"  {row['category'][:18]:<18}{row['quantity_sold']:>6}  {row['sales_amount']:>12,.2f}")
+    lines += ["-" * 40, "By payment method"]
+    for row in report["payments"]:
+        lines.append(f"  {row['method'][:18]:<18}{row['sale_count']:>6}  {row['amount']:>12,.2f}")
+    if report["status"] == "open":
+        lines += ["-" * 40, "Shift still open - not a closing report"]
+    return "\n".join(lines) + "\n"
+
+
+def save_shift_report(report, config):
+    """Write the printable report to SHIFT_REPORT_DIR; returns its path"""
+    os.makedirs(SHIFT_REPORT_DIR, exist_ok=True)
+    if report["status"] == "open":
+        name = f"X_Report_shift{report['shift_id']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    else:
+        name = f"Z_Report_{report['shift_id']}.txt"
+    path = os.path.join(SHIFT_REPORT_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(format_shift_report(report, config))
+    return path
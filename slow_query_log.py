@@ -0,0 +1,155 @@
+"""Opt-in slow-query log for the PostgreSQL backend.
+
+Set SLOW_QUERY_MS to a threshold in milliseconds and every pooled
+connection uses ``SlowQueryCursor``: statements that take longer are
+written with their parameters to SLOW_QUERY_LOG (rotated at
+SLOW_QUERY_LOG_BYTES, keeping SLOW_QUERY_LOG_BACKUPS old files), together
+with the query plan.
+
+SELECTs are re-run under ``EXPLAIN (ANALYZE, BUFFERS)`` for real row counts
+and timings; INSERT/UPDATE/DELETE only get a plain ``EXPLAIN`` so nothing
+is applied twice. Plans run in the caller's transaction inside a savepoint
+and are rate-limited: at most one per statement shape every
+SLOW_QUERY_EXPLAIN_INTERVAL seconds and SLOW_QUERY_MAX_EXPLAINS per minute
+overall.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from psycopg2 import Error
+from psycopg2.extensions import cursor as BaseCursor
+
+SLOW_QUERY_MS = os.getenv('SLOW_QUERY_MS', '')
+ENABLED = SLOW_QUERY_MS != ''
+THRESHOLD = float(SLOW_QUERY_MS or 0) / 1000
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', os.path.join('logs', 'slow_queries.log'))
+SLOW_QUERY_LOG_BYTES = int(os.getenv('SLOW_QUERY_LOG_BYTES', 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 5))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 60))
+SLOW_QUERY_MAX_EXPLAINS = int(os.getenv('SLOW_QUERY_MAX_EXPLAINS', 10))
+
+# Longest parameter dump written per entry
+MAX_PARAMS_LENGTH = 1000
+
+EXPLAINABLE = ("select", "insert", "update", "delete", "values", "with")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_VALUE_LISTS = re.compile(r"\(\?(?:\s*,\s*\?)*\)(?:\s*,\s*\(\?(?:\s*,\s*\?)*\))+")
+
+logger = logging.getLogger("bar.slow_queries")
+logger.propagate = False
+_handler_lock = threading.Lock()
+
+
+def _ensure_handler():
+    with _handler_lock:
+        if logger.handlers:
+            return
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES,
+            backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+def statement_shape(query):
+    """Query text with literals and multi-row VALUES lists collapsed, so
+    the same statement with different values (or batch sizes) matches"""
+    shape = _LITERALS.sub("?", " ".join(query.split()))
+    return _VALUE_LISTS.sub("(?...)", shape)[:300]
+
+
+class ExplainLimiter:
+    """Decides whether a slow statement gets its plan captured"""
+
+    def __init__(self, interval=SLOW_QUERY_EXPLAIN_INTERVAL, per_minute=SLOW_QUERY_MAX_EXPLAINS):
+        self.interval = interval
+        self.per_minute = per_minute
+        self._lock = threading.Lock()
+        self._last_by_shape = {}
+        self._recent = []
+
+    def allow(self, shape):
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_by_shape.get(shape)
+            if last is not None and now - last < self.interval:
+                return False
+            self._recent = [t for t in self._recent if now - t < 60]
+            if len(self._recent) >= self.per_minute:
+                return False
+            self._recent.append(now)
+            self._last_by_shape[shape] = now
+            return True
+
+
+_limiter = ExplainLimiter()
+
+
+def _text(query):
+    return query.decode("utf-8", "replace") if isinstance(query, bytes) else str(query)
+
+
+class SlowQueryCursor(BaseCursor):
+    """psycopg2 cursor that logs statements slower than SLOW_QUERY_MS"""
+
+    def execute(self, query, vars=None):
+        # Server-side (named) cursors only declare here; skip them
+        if self.name is not None:
+            return super().execute(query, vars)
+        start = time.perf_counter()
+        super().execute(query, vars)
+        elapsed = time.perf_counter() - start
+        if elapsed >= THRESHOLD:
+            try:
+                self._log_slow(query, vars, elapsed)
+            except Exception as e:
+                # Diagnostics must never break the query that was measured
+                print(f"⚠️ Slow-query log failed: {e}")
+
+    def _log_slow(self, query, vars, elapsed):
+        _ensure_handler()
+        text = _text(query).strip()
+        shape = statement_shape(text)
+        params = "" if vars is None else repr(vars)
+        if len(params) > MAX_PARAMS_LENGTH:
+            params = params[:MAX_PARAMS_LENGTH] + "..."
+
+        entry = [f"SLOW {elapsed * 1000:.1f} ms", text]
+        if params:
+            entry.append(f"params: {params}")
+        keyword = text.split(None, 1)[0].lower() if text else ""
+        if keyword in EXPLAINABLE and _limiter.allow(shape):
+            plan = self._explain(query, vars, analyze=keyword == "select")
+            if plan:
+                entry.append("plan:")
+                entry.extend("  " + line for line in plan)
+        logger.info("\n".join(entry))
+
+    def _explain(self, query, vars, analyze):
+        """Plan lines for the statement (or the reason EXPLAIN failed)"""
+        statement = _text(self.mogrify(query, vars))
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+        conn = self.connection
+        use_savepoint = not conn.autocommit
+        # A separate plain cursor keeps the caller's result set intact
+        with BaseCursor(conn) as explain:
+            if use_savepoint:
+                explain.execute("SAVEPOINT slow_query_explain")
+            try:
+                explain.execute(prefix + statement)
+                plan = [row[0] for row in explain.fetchall()]
+            except Error as e:
+                if use_savepoint:
+                    explain.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                plan = [f"(EXPLAIN failed: {e})"]
+            if use_savepoint:
+                explain.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
@@ -0,0 +1,596 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import metrics
+from migrations import run_sqlite_migrations, SQLITE_NOW
+from shifts import split_payments, category_totals, build_shift_report
+from stock_history import as_datetime, add_period_stock, build_stock_history
+
+
+# SQLite counterparts of date_trunc for the sales_daily rollup
+PERIOD_BUCKETS = {
+    "day": "d.sale_day",
+    "week": "date(d.sale_day, '-6 days', 'weekday 1')",
+    "month": "strftime('%Y-%m-01', d.sale_day)",
+    "year": "strftime('%Y-01-01', d.sale_day)",
+}
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def is_busy_error(error):
+    """True when another connection holds the database lock, as opposed to
+    a statement that failed (so the work can be kept and retried later)"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        # SQLITE_BUSY / SQLITE_LOCKED, ignoring the extended code bits
+        return code & 0xff in (5, 6)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def _sqlite_timestamp(value):
+    """``value`` in the millisecond ISO format SQLITE_NOW stores"""
+    return as_datetime(value).strftime("%Y-%m-%d %H:%M:%S.%f")[:23]
+
+
+@metrics.instrument("db_call", backend="sqlite")
+class SQLiteDatabaseManager:
+    """Embedded SQLite storage with the same interface as DatabaseManager.
+
+    Lets a single till run against a local file with no database server.
+    Each thread gets its own connection; the database runs in WAL mode so
+    readers never block the writer, and sqlite3's statement cache keeps the
+    hot queries prepared.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('SQLITE_PATH', 'bar_management.db')
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.connect()
+
+    def connect(self):
+        """Open the database file and bring the schema up to date"""
+        conn = self._connection()
+        mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        print(f"✅ SQLite database opened at {self.path} (journal mode: {mode})")
+        self.initialize_database()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly below
+            conn = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None,
+                cached_statements=256, check_same_thread=False
+            )
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute(f"PRAGMA synchronous = {os.getenv('SQLITE_SYNCHRONOUS', 'FULL')}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self, immediate=False):
+        """One transaction; BEGIN IMMEDIATE takes the write lock up front"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def initialize_database(self):
+        """Bring the schema up to date"""
+        try:
+            run_sqlite_migrations(self._connection())
+        except Exception as e:
+            print(f"Error initializing database: {e}")
+            raise
+
+    def get_products(self, category="All", subcategory="All"):
+        """Retrieve products with optional filtering"""
+        query = "SELECT name, current_stock, price, category, subcategory, icon FROM products"
+        params = []
+
+        if category != "All":
+            query += " WHERE category = ?"
+            params.append(category)
+            if subcategory != "All":
+                query += " AND subcategory = ?"
+                params.append(subcategory)
+
+        query += " ORDER BY category, subcategory IS NULL, subcategory, name"
+        rows = self._connection().execute(query, params).fetchall()
+
+        return [{
+            "name": p[0],
+            "stock": p[1],
+            "price": float(p[2]),
+            "category": p[3],
+            "subcategory": p[4],
+            "icon": p[5] if p[5] else "📦"
+        } for p in rows]
+
+    def get_products_since(self, since=None):
+        """Retrieve products changed after ``since`` (all products when None)"""
+        query = """
+            SELECT id, name, current_stock, price, category, subcategory, icon, updated_at
+            FROM products
+        """
+        params = []
+        if since is not None:
+            query += " WHERE updated_at > ?"
+            params.append(since.isoformat(" ", timespec="milliseconds"))
+        rows = self._connection().execute(query, params).fetchall()
+
+        return [{
+            "id": p[0],
+            "name": p[1],
+            "stock": p[2],
+            "price": float(p[3]),
+            "category": p[4],
+            "subcategory": p[5],
+            "icon": p[6] if p[6] else "📦",
+            "updated_at": _parse_timestamp(p[7])
+        } for p in rows]
+
+    def get_report_products(self):
+        """Every product with its current stock, in report order"""
+        rows = self._connection().execute("""
+            SELECT id, name, category, subcategory, current_stock, price
+            FROM products
+            ORDER BY category, subcategory IS NULL, subcategory, name
+        """).fetchall()
+        return [{
+            "id": p[0],
+            "name": p[1],
+            "category": p[2],
+            "subcategory": p[3],
+            "stock": p[4],
+            "price": float(p[5])
+        } for p in rows]
+
+    def get_categories(self):
+        """Get all distinct product categories"""
+        rows = self._connection().execute("SELECT DISTINCT category FROM products ORDER BY category")
+        return ["All"] + [row[0] for row in rows]
+
+    def get_subcategories(self, category):
+        """Get subcategories for a specific category"""
+        rows = self._connection().execute("""
+            SELECT DISTINCT subcategory FROM products
+            WHERE category = ? AND subcategory IS NOT NULL
+            ORDER BY subcategory
+        """, (category,))
+        return ["All"] + [row[0] for row in rows]
+
+    def update_stock(self, product_name, quantity_sold):
+        """Update product stock after sale"""
+        return self.record_sales_batch([
+            {"name": product_name, "quantity": quantity_sold}
+        ])["success"]
+
+    def record_sales_batch(self, items, idempotency_key=None, payments=None, created_at=None):
+        """Record a whole basket of sales in a single transaction.
+
+        Same contract as DatabaseManager.record_sales_batch. BEGIN IMMEDIATE
+        holds the database write lock, so the stock read below cannot go
+        stale before the updates run.
+        """
+        return self.record_sales_batches([(idempotency_key, items, payments, created_at)])[0]
+
+    def record_sales_batches(self, baskets):
+        """Record several ``(idempotency_key, items, payments, created_at)`` baskets with one commit.
+
+        A basket that raises is rolled back to its savepoint and rejected on
+        its own. A locked or busy database is raised (see is_busy_error) so
+        callers can keep the baskets for a later retry; any other failure of
+        the whole transaction marks every result ``"transient": True``.
+        """
+        results = []
+        try:
+            with self._transaction(immediate=True) as conn:
+                for idempotency_key, items, payments, created_at in baskets:
+                    conn.execute("SAVEPOINT basket")
+                    try:
+                        result = self._apply_sales_batch(conn, items, idempotency_key, payments, created_at)
+                    except Exception as e:
+                        if is_busy_error(e):
+                            raise
+                        print(f"Error recording basket: {e}")
+                        result = {"success": False, "items": [], "failures": [{"name": None, "error": str(e)}], "total": 0.0}
+                    if not result["success"]:
+                        conn.execute("ROLLBACK TO SAVEPOINT basket")
+                    conn.execute("RELEASE SAVEPOINT basket")
+                    results.append(result)
+            return results
+        except Exception as e:
+            if is_busy_error(e):
+                raise
+            print(f"Error recording sales batch: {e}")
+            return [
+                {"success": False, "items": [], "failures": [{"name": None, "error": str(e)}], "total": 0.0,
+                 "transient": True}
+                for _ in baskets
+            ]
+
+    def _apply_sales_batch(self, conn, items, idempotency_key=None, payments=None, created_at=None):
+        """Apply one basket inside the caller's transaction"""
+        result = {"success": False, "items": [], "failures": [], "total": 0.0}
+
+        # Merge duplicate lines so each product is touched once
+        quantities = {}
+        for item in items:
+            name = item["name"]
+            quantity = item["quantity"]
+            if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+                result["failures"].append({"name": name, "error": f"Invalid quantity: {quantity}"})
+                continue
+            quantities[name] = quantities.get(name, 0) + quantity
+
+        if result["failures"] or not quantities:
+            if not quantities and not result["failures"]:
+                result["failures"].append({"name": None, "error": "No items to record"})
+            return result
+
+        if idempotency_key:
+            cursor = conn.execute("""
+                INSERT INTO sale_batches (idempotency_key) VALUES (?)
+                ON CONFLICT (idempotency_key) DO NOTHING
+            """, (idempotency_key,))
+            if cursor.rowcount == 0:
+                result["success"] = True
+                result["duplicate"] = True
+                return result
+
+        placeholders = ", ".join("?" * len(quantities))
+        rows = conn.execute(f"""
+            SELECT id, name, current_stock, price, category FROM products
+            WHERE name IN ({placeholders})
+        """, list(quantities)).fetchall()
+        products = {row[1]: row for row in rows}
+
+        for name, quantity in quantities.items():
+            if name not in products:
+                result["failures"].append({"name": name, "error": "Product not found"})
+            elif products[name][2] < quantity:
+                result["failures"].append({
+                    "name": name,
+                    "error": f"Insufficient stock ({products[name][2]} available, {quantity} requested)"
+                })
+
+        if result["failures"]:
+            return result
+
+        lines = []
+        for name, quantity in quantities.items():
+            product_id, _, current_stock, price, category = products[name]
+            lines.append({
+                "id": product_id,
+                "name": name,
+                "category": category,
+                "quantity": quantity,
+                "price": float(price),
+                "sale_amount": quantity * float(price),
+                "previous_stock": current_stock,
+                "new_stock": current_stock - quantity
+            })
+
+        total = sum(line["sale_amount"] for line in lines)
+        payment_splits, error = split_payments(total, payments)
+        if error:
+            result["failures"].append({"name": "Payment", "error": error})
+            return result
+
+        # Decrement in SQL, never below zero, even if another writer
+        # bypassed the write lock held here
+        updated = conn.executemany("""
+            UPDATE products
+            SET current_stock = current_stock - ?, updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')
+            WHERE id = ? AND current_stock >= ?
+        """, [(line["quantity"], line["id"], line["quantity"]) for line in lines])
+        if updated.rowcount != len(lines):
+            raise sqlite3.IntegrityError("Stock changed while recording the sale")
+
+        replayed = f" (replayed, sold {as_datetime(created_at):%Y-%m-%d %H:%M})" if created_at else ""
+        created_at = created_at and _sqlite_timestamp(created_at)
+        conn.executemany(f"""
+            INSERT INTO sales (product_id, quantity_sold, sale_amount, sale_date)
+            VALUES (?, ?, ?, COALESCE(?, {SQLITE_NOW}))
+        """, [(line["id"], line["quantity"], line["sale_amount"], created_at) for line in lines])
+
+        # Logged now: the levels are the current ones, however old the sale
+        conn.executemany("""
+            INSERT INTO stock_updates (product_id, previous_stock, new_stock, notes)
+            VALUES (?, ?, ?, ?)
+        """, [
+            (line["id"], line["previous_stock"], line["new_stock"], f"Sold {line['quantity']} items{replayed}")
+            for line in lines
+        ])
+
+        # Keep the daily rollup in step with the raw sales
+        conn.executemany("""
+            INSERT INTO sales_daily (sale_day, product_id, quantity_sold, sales_amount, sale_count)
+            VALUES (COALESCE(date(?), date('now', 'localtime')), ?, ?, ?, 1)
+            ON CONFLICT (sale_day, product_id) DO UPDATE
+            SET quantity_sold = quantity_sold + excluded.quantity_sold,
+                sales_amount = sales_amount + excluded.sales_amount,
+                sale_count = sale_count + excluded.sale_count
+        """, [(created_at, line["id"], line["quantity"], line["sale_amount"]) for line in lines])
+
+        self._add_to_shift(conn, lines, total, payment_splits, created_at)
+
+        result["success"] = True
+        result["items"] = lines
+        result["total"] = total
+        return result
+
+    def _open_shift_id(self, conn, opened_by=None):
+        """ID of the open shift, opening one if needed (caller holds the
+        write lock)"""
+        row = conn.execute("SELECT id FROM shifts WHERE closed_at IS NULL").fetchone()
+        if row is not None:
+            return row[0]
+        shift_id = conn.execute("INSERT INTO shifts (opened_by) VALUES (?)", (opened_by,)).lastrowid
+        conn.execute("INSERT INTO shift_totals (shift_id) VALUES (?)", (shift_id,))
+        return shift_id
+
+    def _sale_shift(self, conn, created_at=None):
+        """ID of the shift a sale belongs to: the one open at ``created_at``
+        for a sale rung up earlier, otherwise the open shift"""
+        if created_at is not None:
+            row = conn.execute("""
+                SELECT id FROM shifts
+                WHERE opened_at <= ? AND (closed_at IS NULL OR closed_at > ?)
+                ORDER BY opened_at DESC LIMIT 1
+            """, (created_at, created_at)).fetchone()
+            if row is not None:
+                return row[0]
+        return self._open_shift_id(conn)
+
+    def _add_to_shift(self, conn, lines, total, payment_splits, created_at=None):
+        """Add a checkout to its shift's running totals"""
+        shift_id = self._sale_shift(conn, created_at)
+        conn.execute("""
+            UPDATE shift_totals
+            SET gross_sales = gross_sales + ?,
+                items_sold = items_sold + ?,
+                sale_count = sale_count + 1
+            WHERE shift_id = ?
+        """, (total, sum(line["quantity"] for line in lines), shift_id))
+
+        conn.executemany("""
+            INSERT INTO shift_category_totals (shift_id, category, quantity_sold, sales_amount)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (shift_id, category) DO UPDATE
+            SET quantity_sold = quantity_sold + excluded.quantity_sold,
+                sales_amount = sales_amount + excluded.sales_amount
+        """, [(shift_id,) + row for row in category_totals(lines)])
+
+        conn.executemany("""
+            INSERT INTO shift_payment_totals (shift_id, method, amount, sale_count)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT (shift_id, method) DO UPDATE
+            SET amount = amount + excluded.amount,
+                sale_count = sale_count + 1
+        """, [(shift_id, method, amount) for method, amount in payment_splits])
+
+    def _read_shift_report(self, conn, shift_id):
+        shift = conn.execute("""
+            SELECT s.id, s.opened_at, s.opened_by, s.closed_at, s.closed_by,
+                   t.gross_sales, t.items_sold, t.sale_count
+            FROM shifts AS s
+            LEFT JOIN shift_totals AS t ON t.shift_id = s.id
+            WHERE s.id = ?
+        """, (shift_id,)).fetchone()
+        if shift is None:
+            return None
+        shift = (shift[0], _parse_timestamp(shift[1]), shift[2], _parse_timestamp(shift[3])) + tuple(shift[4:])
+        categories = conn.execute("""
+            SELECT category, quantity_sold, sales_amount FROM shift_category_totals
+            WHERE shift_id = ? ORDER BY category
+        """, (shift_id,)).fetchall()
+        payments = conn.execute("""
+            SELECT method, amount, sale_count FROM shift_payment_totals
+            WHERE shift_id = ? ORDER BY method
+        """, (shift_id,)).fetchall()
+        return build_shift_report(shift, categories, payments)
+
+    def open_shift(self, opened_by=None):
+        """Open a shift (or keep the one already open); returns its report"""
+        with self._transaction(immediate=True) as conn:
+            return self._read_shift_report(conn, self._open_shift_id(conn, opened_by))
+
+    def shift_report(self, shift_id=None):
+        """X report: running totals of ``shift_id`` (default: the open
+        shift), or None when there is no such shift"""
+        with self._transaction() as conn:
+            if shift_id is None:
+                row = conn.execute("SELECT id FROM shifts WHERE closed_at IS NULL").fetchone()
+                if row is None:
+                    return None
+                shift_id = row[0]
+            return self._read_shift_report(conn, shift_id)
+
+    def close_shift(self, closed_by=None):
+        """Close the open shift and return its Z report totals, or None when
+        no shift is open"""
+        with self._transaction(immediate=True) as conn:
+            row = conn.execute("SELECT id FROM shifts WHERE closed_at IS NULL").fetchone()
+            if row is None:
+                return None
+            conn.execute(f"""
+                UPDATE shifts SET closed_at = {SQLITE_NOW}, closed_by = ?
+                WHERE id = ?
+            """, (closed_by, row[0]))
+            # Checkpoint stock at the end of every shift
+            self._write_stock_snapshot(conn)
+            return self._read_shift_report(conn, row[0])
+
+    def _write_stock_snapshot(self, conn):
+        """Snapshot the products whose stock may have moved since their last
+        snapshot (caller holds the write lock); returns how many were written"""
+        now = conn.execute(f"SELECT {SQLITE_NOW}").fetchone()[0]
+        return conn.execute("""
+            INSERT INTO stock_snapshots (product_id, snapshot_at, stock)
+            SELECT p.id, ?, p.current_stock
+            FROM products AS p
+            LEFT JOIN stock_snapshots AS s ON s.id = (
+                SELECT id FROM stock_snapshots WHERE product_id = p.id
+                ORDER BY snapshot_at DESC LIMIT 1
+            )
+            WHERE s.id IS NULL OR p.updated_at > s.snapshot_at OR p.current_stock <> s.stock
+        """, (now,)).rowcount
+
+    def _stock_at(self, conn, at, names=None):
+        # The newer of the last snapshot and the last logged change wins;
+        # with neither, the first later change tells what the stock was
+        params = {"at": _sqlite_timestamp(at)}
+        name_filter = ""
+        if names is not None:
+            params.update((f"name{i}", name) for i, name in enumerate(names))
+            name_filter = f"AND p.name IN ({', '.join(f':name{i}' for i in range(len(names)))})"
+        rows = conn.execute(f"""
+            SELECT p.name,
+                   CASE WHEN s.snapshot_at IS NOT NULL
+                             AND (u.update_date IS NULL OR s.snapshot_at >= u.update_date)
+                        THEN s.stock
+                        ELSE COALESCE(u.new_stock, n.previous_stock, p.current_stock)
+                   END
+            FROM products AS p
+            LEFT JOIN stock_snapshots AS s ON s.id = (
+                SELECT id FROM stock_snapshots
+                WHERE product_id = p.id AND snapshot_at <= :at
+                ORDER BY snapshot_at DESC LIMIT 1
+            )
+            LEFT JOIN stock_updates AS u ON u.id = (
+                SELECT id FROM stock_updates
+                WHERE product_id = p.id AND update_date <= :at
+                ORDER BY update_date DESC, id DESC LIMIT 1
+            )
+            LEFT JOIN stock_updates AS n ON n.id = (
+                SELECT id FROM stock_updates
+                WHERE product_id = p.id AND update_date > :at
+                ORDER BY update_date, id LIMIT 1
+            )
+            WHERE p.created_at <= :at {name_filter}
+        """, params).fetchall()
+        return dict(rows)
+
+    def snapshot_stock(self):
+        """Checkpoint current stock levels; returns the number of products
+        snapshotted (unchanged ones are skipped)"""
+        with self._transaction(immediate=True) as conn:
+            return self._write_stock_snapshot(conn)
+
+    def stock_at(self, at, names=None):
+        """``{name: stock}`` at ``at`` (datetime, date or ISO string) for the
+        given product names, or every product that existed by then"""
+        with self._transaction() as conn:
+            return self._stock_at(conn, at, names)
+
+    def stock_history(self, name, start, end=None):
+        """Opening and closing stock of ``name`` and every logged change
+        between ``start`` and ``end`` (default: now); None if unknown"""
+        start = as_datetime(start)
+        end = as_datetime(end) if end is not None else datetime.now()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id FROM products WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            changes = conn.execute("""
+                SELECT update_date, previous_stock, new_stock, notes FROM stock_updates
+                WHERE product_id = ? AND update_date > ? AND update_date <= ?
+                ORDER BY update_date, id
+            """, (row[0], _sqlite_timestamp(start), _sqlite_timestamp(end))).fetchall()
+            opening = self._stock_at(conn, start, [name]).get(name)
+            closing = self._stock_at(conn, end, [name]).get(name)
+        changes = [(_parse_timestamp(at),) + tuple(rest) for at, *rest in changes]
+        return build_stock_history(name, start, end, opening, closing, changes)
+
+    def get_sales_summary(self, period="day", start=None, end=None, by="product", with_stock=False):
+        """Sales totals per day/week/month/year from the daily rollup;
+        ``with_stock`` adds each product's stock at the start and end of
+        the period"""
+        if period not in PERIOD_BUCKETS:
+            raise ValueError(f"Unknown period: {period}")
+        per_product = by == "product"
+        rows = self._connection().execute(f"""
+            SELECT {PERIOD_BUCKETS[period]} AS period, p.category,
+                   {"p.id, p.name," if per_product else ""}
+                   SUM(d.quantity_sold), SUM(d.sales_amount), SUM(d.sale_count)
+            FROM sales_daily AS d
+            JOIN products AS p ON p.id = d.product_id
+            WHERE (? IS NULL OR d.sale_day >= ?)
+              AND (? IS NULL OR d.sale_day <= ?)
+            GROUP BY 1, 2{", 3, 4" if per_product else ""}
+            ORDER BY 1, 2{", 4" if per_product else ""}
+        """, (
+            start and start.isoformat(), start and start.isoformat(),
+            end and end.isoformat(), end and end.isoformat()
+        )).fetchall()
+
+        summary = []
+        for row in rows:
+            entry = {"period": date.fromisoformat(row[0]), "category": row[1]}
+            if per_product:
+                entry["product_id"], entry["name"] = row[2], row[3]
+                row = row[2:]
+            entry["quantity_sold"] = int(row[2])
+            entry["sales_amount"] = float(row[3])
+            entry["sale_count"] = int(row[4])
+            summary.append(entry)
+        if with_stock and per_product:
+            with self._transaction() as conn:
+                add_period_stock(summary, period, lambda at, names: self._stock_at(conn, at, names))
+        return summary
+
+    def get_product_price(self, product_name):
+        """Get price for a specific product"""
+        result = self._connection().execute(
+            "SELECT price FROM products WHERE name = ?", (product_name,)
+        ).fetchone()
+        return float(result[0]) if result else 0.0
+
+    def add_new_product(self, product_data):
+        """Add a new product to the database"""
+        try:
+            with self._transaction() as conn:
+                cursor = conn.execute("""
+                    INSERT INTO products
+                    (name, category, subcategory, current_stock, price, icon)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (name) DO NOTHING
+                """, (
+                    product_data["name"],
+                    product_data["category"],
+                    product_data.get("subcategory"),
+                    product_data["stock"],
+                    product_data["price"],
+                    product_data.get("icon", "📦")
+                ))
+                return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error adding product: {e}")
+            return False
+
+    def close(self):
+        """Close every per-thread connection"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
@@ -0,0 +1,132 @@
+"""Point-in-time stock levels from snapshots and the stock_updates log.
+
+Every stock change a checkout or catalog import makes is logged to
+``stock_updates`` with the level it left behind, and ``stock_snapshots``
+checkpoints each product's level periodically (every
+STOCK_SNAPSHOT_INTERVAL seconds in the app, at every Z report, and from
+``python stock_history.py snapshot``). The stock of a product at any
+moment is the newer of its last snapshot and its last logged change
+before that moment: two index lookups however long the history is.
+Snapshots also pick up changes that were never logged (manual edits,
+products added with opening stock).
+
+    python stock_history.py at "2026-10-16 18:00" --product "Tusker Lager"
+    python stock_history.py history "Tusker Lager" --start 2026-10-01 --end 2026-10-18
+    python stock_history.py snapshot
+"""
+import argparse
+import os
+from datetime import date, datetime, timedelta
+
+from db_backend import open_database
+
+# Seconds between the app's periodic stock snapshots (0 disables them)
+STOCK_SNAPSHOT_INTERVAL = int(os.getenv('STOCK_SNAPSHOT_INTERVAL', 3600))
+
+
+def as_datetime(value):
+    """``value`` (datetime, date or ISO string) as a datetime; a bare
+    date means midnight at the start of that day"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value).strip())
+
+
+def next_period_start(period, start):
+    """First day of the day/week/month/year bucket after the one starting
+    at ``start``"""
+    if period == "day":
+        return start + timedelta(days=1)
+    if period == "week":
+        return start + timedelta(days=7)
+    if period == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    if period == "year":
+        return date(start.year + 1, 1, 1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+def add_period_stock(summary, period, stock_at):
+    """Add ``stock_before``/``stock_after`` (stock at the start and end of
+    each row's period) to per-product ``get_sales_summary`` rows.
+
+    ``stock_at(at, names)`` is the backend's lookup; it runs once per
+    period boundary for all the products sold in that period.
+    """
+    by_period = {}
+    for row in summary:
+        by_period.setdefault(row["period"], []).append(row)
+    for start, rows in by_period.items():
+        names = sorted({row["name"] for row in rows})
+        before = stock_at(start, names)
+        after = stock_at(next_period_start(period, start), names)
+        for row in rows:
+            row["stock_before"] = before.get(row["name"])
+            row["stock_after"] = after.get(row["name"])
+    return summary
+
+
+def build_stock_history(name, start, end, opening, closing, changes):
+    """History dict for ``name`` from the stock at ``start`` and ``end`` and
+    the ``(at, previous_stock, new_stock, notes)`` changes in between"""
+    return {
+        "name": name,
+        "start": start,
+        "end": end,
+        "opening_stock": opening,
+        "closing_stock": closing,
+        "changes": [
+            {"at": at, "previous_stock": previous, "new_stock": new, "notes": notes}
+            for at, previous, new, notes in changes
+        ]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stock levels at past points in time")
+    commands = parser.add_subparsers(dest="command", required=True)
+    at_parser = commands.add_parser("at", help="Stock of every (or the given) product at a moment")
+    at_parser.add_argument("when", help="Date or date and time, e.g. \"2026-10-16 18:00\"")
+    at_parser.add_argument("--product", action="append", help="Only this product (repeatable)")
+    history_parser = commands.add_parser("history", help="Every stock change of a product over a range")
+    history_parser.add_argument("name")
+    history_parser.add_argument("--start", required=True)
+    history_parser.add_argument("--end", default=None, help="Default: now")
+    commands.add_parser("snapshot", help="Checkpoint the current stock levels")
+    args = parser.parse_args(argv)
+
+    db = open_database(minconn=1, maxconn=1)
+    try:
+        if args.command == "snapshot":
+            print(f"📸 Snapshot of {db.snapshot_stock()} changed products written")
+        elif args.command == "at":
+            when = as_datetime(args.when)
+            levels = db.stock_at(when, args.product)
+            print(f"📦 Stock at {when:%Y-%m-%d %H:%M}:")
+            for name in sorted(levels):
+                print(f"  {name}: {levels[name]}")
+            missing = set(args.product or ()) - set(levels)
+            if missing:
+                print(f"⚠️ Not in the catalog at that time: {', '.join(sorted(missing))}")
+                return 1
+        else:
+            history = db.stock_history(args.name, as_datetime(args.start), args.end and as_datetime(args.end))
+            if history is None:
+                print(f"❌ Product not found: {args.name}")
+                return 1
+            opening = history["opening_stock"]
+            opening = "not in the catalog yet" if opening is None else opening
+            print(f"📦 {history['name']}: {opening} at {history['start']:%Y-%m-%d %H:%M}")
+            for change in history["changes"]:
+                print(f"  {change['at']:%Y-%m-%d %H:%M:%S}  {change['previous_stock']:>6} -> "
+                      f"{change['new_stock']:<6} {change['notes'] or ''}")
+            print(f"📦 {history['closing_stock']} at {history['end']:%Y-%m-%d %H:%M}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def restore_pgoptions():
+    """stress_sellers.open_postgres points PGOPTIONS at its throwaway
+    schema and leaves it set; put the original value back afterwards"""
+    original = os.environ.get("PGOPTIONS")
+    yield
+    if original is None:
+        os.environ.pop("PGOPTIONS", None)
+    else:
+        os.environ["PGOPTIONS"] = original
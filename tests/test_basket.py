@@ -0,0 +1,23 @@
+"""Basket running totals stay in step with its lines."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from basket import Basket  # noqa: E402
+
+BEER = {"name": "Tusker Lager", "price": 250.0}
+
+
+def test_negative_quantity_removes_the_line_without_skewing_totals():
+    basket = Basket()
+    for quantity in (-3, 0, 2):
+        basket.set_quantity(BEER, quantity)
+    assert basket.lines() == [(BEER, 2)]
+    assert basket.total_items == 2
+    assert basket.total_revenue == 500.0
+
+    basket.set_quantity(BEER, -1)
+    assert len(basket) == 0
+    assert basket.total_items == 0
+    assert basket.total_revenue == 0
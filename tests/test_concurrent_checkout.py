@@ -0,0 +1,73 @@
+"""Concurrent tills selling a small stock never oversell.
+
+Uses the sellers from benchmarks/stress_sellers.py. SQLite always runs;
+PostgreSQL runs when the DB_* settings reach a server and is skipped
+otherwise.
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [REPO_DIR, os.path.join(REPO_DIR, "benchmarks")]
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+import stress_sellers  # noqa: E402
+
+TILLS = 6
+STOCK = 20
+SECONDS = 3
+
+
+def postgres_available():
+    try:
+        from db_pool import create_pool
+        create_pool(minconn=1, maxconn=1).closeall()
+        return True
+    except Exception:
+        return False
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def backend(request, restore_pgoptions):
+    if request.param == "postgres" and not postgres_available():
+        pytest.skip("PostgreSQL is not reachable")
+    return request.param
+
+
+def test_concurrent_sellers_never_oversell(backend):
+    args = stress_sellers.parse_args([
+        "--backend", backend, "--tills", str(TILLS), "--stock", str(STOCK),
+        "--products", "3", "--basket-size", "2"
+    ])
+    names = [f"STRESS BEER {i}" for i in range(args.products)]
+    opener = stress_sellers.open_postgres if backend == "postgres" else stress_sellers.open_sqlite
+    setup, till, cleanup = opener(args, names)
+    try:
+        stats = stress_sellers.Stats()
+        deadline = time.monotonic() + SECONDS
+        threads = [
+            threading.Thread(target=stress_sellers.sell, args=(till(), names, args, stats, deadline, i))
+            for i in range(TILLS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stock = stress_sellers.stock_levels(setup, names)
+        recorded = stress_sellers.units_recorded(setup, names)
+    finally:
+        cleanup()
+
+    assert stats.errors == 0
+    assert stats.sold > 0
+    # The stock ran out, so later baskets had to be turned away
+    assert stats.rejected > 0
+    for name in names:
+        assert stock[name] >= 0
+        assert STOCK - stock[name] == recorded.get(name, 0)
+        assert stats.units.get(name, 0) == recorded.get(name, 0)
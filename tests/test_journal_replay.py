@@ -0,0 +1,61 @@
+"""Replaying an old journaled sale keeps the stock history consistent.
+
+The sale and its rollup are dated when it was rung up, but its stock
+change is logged at replay time, so the reconstructed stock still ends at
+the current level. SQLite always runs; PostgreSQL is skipped when the
+DB_* settings don't reach a server.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [REPO_DIR, os.path.join(REPO_DIR, "benchmarks")]
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+import stress_sellers  # noqa: E402
+from sales_journal import SalesJournal  # noqa: E402
+
+NAME = "STRESS BEER 0"
+
+
+def postgres_available():
+    try:
+        from db_pool import create_pool
+        create_pool(minconn=1, maxconn=1).closeall()
+        return True
+    except Exception:
+        return False
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def db(request, restore_pgoptions):
+    if request.param == "postgres" and not postgres_available():
+        pytest.skip("PostgreSQL is not reachable")
+    args = stress_sellers.parse_args(["--backend", request.param, "--stock", "10", "--products", "1"])
+    opener = stress_sellers.open_postgres if request.param == "postgres" else stress_sellers.open_sqlite
+    setup, _, cleanup = opener(args, [NAME])
+    yield setup
+    cleanup()
+
+
+def test_replayed_old_sale_keeps_current_stock(db, tmp_path):
+    # Stock history exists before the offline sale is replayed
+    assert db.record_sales_batch([{"name": NAME, "quantity": 4}])["success"]
+    db.snapshot_stock()
+
+    journal = SalesJournal(str(tmp_path / "journal.jsonl"))
+    key = journal.append([{"name": NAME, "quantity": 1}])
+    sold_at = datetime.now() - timedelta(days=40)
+    journal._entries[key]["created_at"] = sold_at.isoformat()
+    assert journal.replay(db)["applied"] == 1
+
+    current = stress_sellers.stock_levels(db, [NAME])[NAME]
+    assert current == 5
+    assert db.stock_at(datetime.now() + timedelta(seconds=1), [NAME]) == {NAME: current}
+
+    summary = db.get_sales_summary("day", start=sold_at.date(), end=sold_at.date())
+    assert [(row["period"], row["quantity_sold"]) for row in summary] == [(sold_at.date(), 1)]